@@ -4,14 +4,14 @@ import streamlit as st
 import hashlib
 import sqlite3
 import re
+from db import pool
+
+SELECT_PASSWORD = 'SELECT password FROM users WHERE email = ?'
+INSERT_USER = 'INSERT INTO users (email, password) VALUES (?, ?)'
 
 def init_auth_db():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (email TEXT PRIMARY KEY, password TEXT)''')
-    conn.commit()
-    conn.close()
+    # Runs the schema setup once per process; later reruns return immediately
+    pool.ensure_schema()
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -21,11 +21,7 @@ def is_valid_email(email):
     return re.match(pattern, email) is not None
 
 def authenticate(email, password):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT password FROM users WHERE email = ?', (email,))
-    result = c.fetchone()
-    conn.close()
+    result = pool.fetch_one(SELECT_PASSWORD, (email,))
 
     if result and result[0] == hash_password(password):
         return True
@@ -38,16 +34,10 @@ def create_account(email, password):
     if len(password) < 6:
         return False, "Password must be at least 6 characters"
 
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
     try:
-        c.execute('INSERT INTO users (email, password) VALUES (?, ?)',
-                 (email, hash_password(password)))
-        conn.commit()
-        conn.close()
+        pool.execute(INSERT_USER, (email, hash_password(password)))
         return True, "Account created successfully"
     except sqlite3.IntegrityError:
-        conn.close()
         return False, "Email already exists"
 
 def login_form():
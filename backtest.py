@@ -0,0 +1,271 @@
+"""Vectorized backtests of the indicator rules.
+
+A rule turns a symbol's closes into a long/flat position per bar (1 or 0)
+with whole-array NumPy operations. The position decided at a bar's close
+is held over the next bar, so a signal never trades on its own price.
+Equity, drawdown and trade statistics then follow from the position and
+close arrays without a per-bar loop.
+
+Indicator series are memoized per symbol by their parameters. They can be
+seeded from calculate_technical_indicators output, which means a backtest
+with the default windows reuses the columns the Technical Indicators tab
+already computed. A parameter sweep computes each distinct window only
+once per symbol, and symbols are spread over a process pool.
+"""
+
+import functools
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import config
+from compare import bars_per_year
+from metrics import timed
+
+# calculate_technical_indicators column -> the series it holds here
+SEEDS = {
+    'MA20': ('sma', 20),
+    'MA50': ('sma', 50),
+    'MA200': ('sma', 200),
+    'RSI': ('rsi', 14),
+    'MACD': ('macd', 12, 26),
+    'Signal_Line': ('signal', 12, 26, 9),
+    'BB_upper': ('upper', 20, 2),
+    'BB_lower': ('lower', 20, 2),
+}
+
+
+def _sma(series, window):
+    return series.close_series.rolling(window=window).mean().to_numpy()
+
+
+def _std(series, window):
+    return series.close_series.rolling(window=window).std().to_numpy()
+
+
+def _ema(series, span):
+    return series.close_series.ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def _rsi(series, period):
+    # Same definition as the RSI indicator column
+    delta = np.diff(series.close, prepend=np.nan)
+    gain = pd.Series(np.where(delta > 0, delta, 0.0)).rolling(window=period).mean().to_numpy()
+    loss = pd.Series(np.where(delta < 0, -delta, 0.0)).rolling(window=period).mean().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + gain / loss)
+
+
+def _macd(series, fast, slow):
+    return series.get('ema', fast) - series.get('ema', slow)
+
+
+def _signal(series, fast, slow, span):
+    return pd.Series(series.get('macd', fast, slow)).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def _upper(series, window, width):
+    return series.get('sma', window) + width * series.get('std', window)
+
+
+def _lower(series, window, width):
+    return series.get('sma', window) - width * series.get('std', window)
+
+
+_COMPUTE = {
+    'sma': _sma, 'std': _std, 'ema': _ema, 'rsi': _rsi,
+    'macd': _macd, 'signal': _signal, 'upper': _upper, 'lower': _lower,
+}
+
+
+class PriceSeries:
+    """Closes plus a memo of indicator arrays keyed by (name, *params)."""
+
+    def __init__(self, close, indicators=None):
+        self.close = np.asarray(close, dtype=np.float64)
+        self.close_series = pd.Series(self.close)
+        self._values = {}
+        if indicators is not None:
+            for column, key in SEEDS.items():
+                if column in indicators:
+                    self._values[key] = indicators[column].to_numpy(dtype=np.float64)
+
+    def get(self, name, *params):
+        key = (name,) + params
+        if key not in self._values:
+            self._values[key] = _COMPUTE[name](self, *params)
+        return self._values[key]
+
+
+def hold(enter, exit):
+    """1 from each bar where `enter` is true until the next bar where `exit` is, else 0."""
+    events = np.where(enter, 1.0, np.where(exit, 0.0, np.nan))
+    # Carry the most recent event forward
+    last = np.where(np.isnan(events), 0, np.arange(len(events)))
+    state = events[np.maximum.accumulate(last)]
+    return np.nan_to_num(state, nan=0.0)
+
+
+def ma_cross(series, fast=20, slow=50):
+    with np.errstate(invalid='ignore'):
+        return (series.get('sma', fast) > series.get('sma', slow)).astype(np.float64)
+
+
+def rsi_threshold(series, period=14, lower=30, upper=70):
+    rsi = series.get('rsi', period)
+    with np.errstate(invalid='ignore'):
+        return hold(rsi < lower, rsi > upper)
+
+
+def macd_cross(series, fast=12, slow=26, signal=9):
+    with np.errstate(invalid='ignore'):
+        return (series.get('macd', fast, slow) > series.get('signal', fast, slow, signal)).astype(np.float64)
+
+
+def band_touch(series, window=20, width=2):
+    close = series.close
+    with np.errstate(invalid='ignore'):
+        return hold(close <= series.get('lower', window, width), close >= series.get('upper', window, width))
+
+
+# name -> (label, rule, default parameters, sweep grid ranges)
+RULES = {
+    'ma_cross': ('Moving average crossover', ma_cross, {'fast': 20, 'slow': 50},
+                 {'fast': [5, 10, 20, 30, 50], 'slow': [50, 100, 150, 200]}),
+    'rsi': ('RSI thresholds', rsi_threshold, {'period': 14, 'lower': 30, 'upper': 70},
+            {'period': [7, 14, 21], 'lower': [20, 25, 30, 35], 'upper': [65, 70, 75, 80]}),
+    'macd': ('MACD / signal crossover', macd_cross, {'fast': 12, 'slow': 26, 'signal': 9},
+             {'fast': [8, 12, 16], 'slow': [21, 26, 34], 'signal': [5, 9, 12]}),
+    'bands': ('Bollinger band touch', band_touch, {'window': 20, 'width': 2.0},
+              {'window': [10, 20, 30, 50], 'width': [1.5, 2, 2.5, 3]}),
+}
+
+
+def param_grid(ranges):
+    """Every combination of `ranges` ({name: values}) as a list of dicts."""
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*ranges.values())]
+
+
+def simulate(close, position, cost=config.BACKTEST_COST_BPS / 10000, periods=252):
+    """Equity curve, drawdown and statistics of holding `position` over `close`.
+
+    `cost` is charged as a fraction of equity on every change of position.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    position = np.asarray(position, dtype=np.float64)
+    returns = close[1:] / close[:-1] - 1
+    held = position[:-1]
+    turnover = np.abs(np.diff(position, prepend=0.0))[:-1]
+    strategy = held * returns - turnover * cost
+    equity = np.concatenate(([1.0], np.cumprod(1 + strategy)))
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    change = np.diff(position, prepend=0.0, append=0.0)
+    entries = np.flatnonzero(change[:-1] > 0)
+    # A position still open on the last bar is marked to its close
+    exits = np.minimum(np.flatnonzero(change < 0), len(close) - 1)
+    trades = close[exits] / close[entries] * (1 - cost) ** 2 - 1
+
+    bars = max(len(strategy), 1)
+    volatility = strategy.std() * np.sqrt(periods) if len(strategy) > 1 else np.nan
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stats = {
+            'Total Return': equity[-1] - 1,
+            'Annual Return': equity[-1] ** (periods / bars) - 1,
+            'Volatility': volatility,
+            'Sharpe': strategy.mean() * periods / volatility if volatility else np.nan,
+            'Max Drawdown': drawdown.min(),
+            'Trades': len(trades),
+            'Win Rate': (trades > 0).mean() if len(trades) else np.nan,
+            'Avg Trade': trades.mean() if len(trades) else np.nan,
+            'Exposure': held.mean() if len(held) else 0.0,
+            'Buy & Hold': close[-1] / close[0] - 1,
+        }
+    return {'equity': equity, 'drawdown': drawdown, 'entries': entries, 'exits': exits,
+            'trades': trades, 'stats': stats}
+
+
+@timed('backtest', symbol_arg=None)
+def backtest(df, rule, params=None, interval='1d', cost=config.BACKTEST_COST_BPS / 10000):
+    """Backtest one rule on a history frame, reusing any indicator columns it has.
+
+    Returns equity and drawdown as Series on df's index, a trades frame and
+    the statistics dict.
+    """
+    df = df[df['Close'].notna()]
+    _, fn, defaults, _ = RULES[rule]
+    series = PriceSeries(df['Close'], indicators=df)
+    result = simulate(series.close, fn(series, **{**defaults, **(params or {})}), cost, bars_per_year(interval))
+    index = df.index
+    trades = pd.DataFrame({
+        'Entry': index[result['entries']],
+        'Exit': index[result['exits']],
+        'Bars': result['exits'] - result['entries'],
+        'Return': result['trades'],
+    })
+    return {
+        'equity': pd.Series(result['equity'], index=index, name='Strategy'),
+        'drawdown': pd.Series(result['drawdown'], index=index, name='Drawdown'),
+        'trades': trades,
+        'stats': result['stats'],
+    }
+
+
+def _sweep_symbol(symbol, close, rule, grid, periods, cost):
+    fn = RULES[rule][1]
+    series = PriceSeries(close)
+    return [{'Symbol': symbol, **params, **simulate(series.close, fn(series, **params), cost, periods)['stats']}
+            for params in grid]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs server threads can deadlock the child
+            _pool = ProcessPoolExecutor(max_workers=config.BACKTEST_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+@timed('backtest.sweep', symbol_arg=None)
+def sweep(closes, rule, ranges=None, interval='1d', cost=config.BACKTEST_COST_BPS / 10000,
+          workers=config.BACKTEST_WORKERS):
+    """Backtest every parameter combination on every column of `closes`.
+
+    `ranges` defaults to the rule's sweep grid. Symbols run in parallel on a
+    process pool when there are enough of them; results come back as one
+    row per (symbol, parameters), best Sharpe first.
+    """
+    # A fast window at or above the slow one never differs from flat
+    grid = [params for params in param_grid(ranges or RULES[rule][3])
+            if params.get('fast', 0) < params.get('slow', np.inf)]
+    run = functools.partial(_sweep_symbol, rule=rule, grid=grid, periods=bars_per_year(interval), cost=cost)
+    symbols, arrays = [], []
+    for symbol in closes.columns:
+        close = closes[symbol].dropna().to_numpy(dtype=np.float64)
+        if len(close) > 1:
+            symbols.append(symbol)
+            arrays.append(close)
+    if workers > 1 and len(symbols) >= config.BACKTEST_PARALLEL_MIN_SYMBOLS:
+        try:
+            chunksize = max(1, len(symbols) // (workers * 4))
+            rows = list(_process_pool().map(run, symbols, arrays, chunksize=chunksize))
+        except Exception as e:
+            print(f"Parallel sweep failed, running in process: {str(e)}")
+            rows = list(map(run, symbols, arrays))
+    else:
+        rows = list(map(run, symbols, arrays))
+    table = pd.DataFrame([row for symbol_rows in rows for row in symbol_rows])
+    if table.empty:
+        return table
+    return table.sort_values('Sharpe', ascending=False, na_position='last').reset_index(drop=True)
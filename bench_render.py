@@ -0,0 +1,244 @@
+"""End-to-end render benchmark for the dashboard.
+
+Drives main.py headlessly with Streamlit's AppTest against the replay
+market data provider (synthetic fixtures, fixed per-call latency). It
+times the first render and reruns of every section at several
+timeframe/interval combinations and watchlist sizes, and reports p50/p95
+latency, upstream calls and peak Python memory per scenario.
+
+    python bench_render.py                    # compare against bench_baseline.json
+    python bench_render.py --update-baseline  # store this run as the new baseline
+    python bench_render.py --quick            # fewer scenarios and reruns
+
+Exits with status 1 when a scenario regresses past the baseline.
+"""
+
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Keep benchmark runs away from the real databases, price store and prefetcher
+_WORKDIR = tempfile.mkdtemp(prefix='bench_render_')
+os.environ['DB_PATH'] = os.path.join(_WORKDIR, 'users.db')
+os.environ['PRICE_STORE_DIR'] = os.path.join(_WORKDIR, 'price_store')
+os.environ['NEWS_DB_PATH'] = os.path.join(_WORKDIR, 'news.db')
+os.environ['SCREENER_UNIVERSE'] = os.path.join(_WORKDIR, 'universe.csv')
+os.environ['SCREENER_INDEX_PATH'] = os.path.join(_WORKDIR, 'screener_index.parquet')
+os.environ['PREFETCH_ENABLED'] = '0'
+os.environ['QUOTES_REFRESH_SECONDS'] = '0'
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import config
+import indicators
+import price_store
+from cache import figure_cache, market_cache
+from db import pool
+from news import news_index
+from overview import overview_snapshots
+from providers import ReplayProvider, set_provider, write_fixtures
+from screener import screener_index
+from utils import add_to_watchlist
+
+# AppTest's bare-mode runs log a harmless "missing ScriptRunContext" warning per call
+# (a filter, because Streamlit resets logger levels when it loads its config)
+logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').addFilter(
+    lambda record: 'missing ScriptRunContext' not in record.getMessage())
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(APP_DIR, 'bench_baseline.json')
+
+TABS = ["Chart Analysis", "Company Info", "Technical Indicators", "News & Updates", "Market Overview",
+        "Comparison", "Screener"]
+TIMEFRAMES = [('6mo', '1d'), ('5y', '1d'), ('5d', '1m'), ('1d', '5m')]
+WATCHLIST_SIZES = [0, 25, 50]
+UPSTREAM_LATENCY = 0.02   # seconds per replayed upstream call
+RERUNS = 5
+
+# A scenario regresses when its p95 grows by more than this fraction (plus a
+# small absolute allowance for timer noise) or it makes more upstream calls
+LATENCY_TOLERANCE = 0.5
+LATENCY_FLOOR_MS = 25.0
+
+WATCHLIST_SYMBOLS = [f'W{i:02d}' for i in range(max(WATCHLIST_SIZES))]
+EMAIL = 'bench@example.com'
+
+
+def _bars(index, seed):
+    close = 100 + np.cumsum(np.random.default_rng(seed).normal(0, 0.5, len(index)))
+    return pd.DataFrame({'Open': close, 'High': close + 0.5, 'Low': close - 0.5,
+                         'Close': close, 'Volume': 1e6}, index=index)
+
+
+def generate_fixtures(root):
+    """Deterministic replay fixtures for every symbol the dashboard can touch."""
+    end = pd.Timestamp('2026-10-16 16:00', tz='America/New_York')
+    daily = pd.date_range(end=end.normalize(), periods=5 * 252, freq='B')
+    sessions = daily[-5:]
+    minutes = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(day + pd.Timedelta('9h30min'), periods=390, freq='min').asi8 for day in sessions
+    ])).tz_localize('UTC').tz_convert(end.tz)
+    five_minutes = minutes[::5]
+
+    symbols = ['AAPL'] + config.TRENDING_SYMBOLS + list(config.MARKET_INDICES) + WATCHLIST_SYMBOLS
+    # The screener universe is every stock the fixtures cover
+    stocks = list(dict.fromkeys(['AAPL'] + config.TRENDING_SYMBOLS + WATCHLIST_SYMBOLS))
+    pd.DataFrame({'Symbol': stocks, 'Name': stocks, 'Sector': 'Technology'}).to_csv(
+        config.SCREENER_UNIVERSE, index=False)
+    for seed, symbol in enumerate(dict.fromkeys(symbols)):
+        info = {'shortName': symbol, 'longName': f'{symbol} Inc.', 'currentPrice': 100.0 + seed,
+                'regularMarketChangePercent': 0.5, 'volume': 1e6, 'dayHigh': 101.0, 'dayLow': 99.0,
+                'marketCap': 1e11, 'trailingPE': 20.0, 'sector': 'Technology', 'industry': 'Software',
+                'website': 'https://example.com', 'longBusinessSummary': 'Synthetic company.',
+                'fiftyTwoWeekHigh': 120.0, 'fiftyTwoWeekLow': 80.0, 'averageVolume': 1e6}
+        news = [{'title': f'{symbol} headline {i}', 'publisher': 'Replay Wire',
+                 'link': f'https://example.com/{symbol}/{i}', 'providerPublishTime': 1760600000 + i,
+                 'summary': 'Synthetic article.'} for i in range(8)]
+        write_fixtures(root, symbol, info=info, news=news, history={
+            '1d': _bars(daily, seed), '1m': _bars(minutes, seed), '5m': _bars(five_minutes, seed),
+        })
+
+
+def _reset_process_caches():
+    market_cache.clear()
+    figure_cache.clear()
+    indicators._engines.clear()
+    price_store.price_store.root = tempfile.mkdtemp(dir=_WORKDIR)
+    # Articles may stay indexed, but every symbol's news counts as stale again
+    news_index.pool.execute('DELETE FROM news_fetches')
+    overview_snapshots.clear()
+    if os.path.exists(screener_index.path):
+        os.remove(screener_index.path)
+    screener_index._frame = None
+    screener_index.updated_at = 0.0
+
+
+def _new_session(tab, timeframe, interval):
+    at = AppTest.from_file(os.path.join(APP_DIR, 'main.py'), default_timeout=120)
+    at.session_state['authenticated'] = True
+    at.session_state['email'] = EMAIL
+    at.session_state['active_tab'] = tab
+    at.run()
+    for widget, value in (('Timeframe', timeframe), ('Interval', interval)):
+        matches = [box for box in at.selectbox if box.label == widget]
+        if matches and matches[0].value != value:
+            matches[0].set_value(value)
+            at.run()
+    return at
+
+
+def _timed_run(at, provider):
+    # A full collection triggered by earlier scenarios' garbage would be
+    # charged to whichever render happens to be running
+    gc.collect()
+    calls = provider.total_calls()
+    start = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(f"render raised: {at.exception[0].value}")
+    return elapsed, provider.total_calls() - calls
+
+
+def run_scenario(provider, tab, timeframe, interval, watchlist_size, reruns):
+    pool.execute('DELETE FROM watchlist WHERE email = ?', (EMAIL,))
+    for symbol in WATCHLIST_SYMBOLS[:watchlist_size]:
+        add_to_watchlist(EMAIL, symbol)
+
+    # The widget setup renders once; clear process caches afterwards so the
+    # timed first render starts cold
+    at = _new_session(tab, timeframe, interval)
+    _reset_process_caches()
+    first_ms, first_calls = _timed_run(at, provider)
+
+    timings, rerun_calls = [], 0
+    for _ in range(reruns):
+        elapsed, calls = _timed_run(at, provider)
+        timings.append(elapsed)
+        rerun_calls += calls
+
+    # Peak memory is measured on a separate cold render; tracing slows execution
+    _reset_process_caches()
+    tracemalloc.start()
+    _timed_run(at, provider)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'first_ms': round(first_ms, 1),
+        'rerun_p50_ms': round(float(np.percentile(timings, 50)), 1),
+        'rerun_p95_ms': round(float(np.percentile(timings, 95)), 1),
+        'first_calls': first_calls,
+        'rerun_calls': rerun_calls,
+        'peak_mb': round(peak / 2 ** 20, 1),
+    }
+
+
+def scenarios(quick=False):
+    timeframes = TIMEFRAMES[:2] if quick else TIMEFRAMES
+    for tab in TABS:
+        for timeframe, interval in timeframes:
+            yield tab, timeframe, interval, 5
+    # Watchlist size only changes the sidebar, so vary it on one section
+    for size in WATCHLIST_SIZES:
+        yield TABS[0], '6mo', '1d', size
+
+
+def compare(results, baseline):
+    failures = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        for metric in ('first_ms', 'rerun_p95_ms'):
+            limit = expected[metric] * (1 + LATENCY_TOLERANCE) + LATENCY_FLOOR_MS
+            if result[metric] > limit:
+                failures.append(f"{name}: {metric} {result[metric]} > {limit:.1f} (baseline {expected[metric]})")
+        for metric in ('first_calls', 'rerun_calls'):
+            if result[metric] > expected[metric]:
+                failures.append(f"{name}: {metric} {result[metric]} > baseline {expected[metric]}")
+    return failures
+
+
+def main(argv):
+    quick = '--quick' in argv
+    reruns = 2 if quick else RERUNS
+    fixtures = os.path.join(_WORKDIR, 'fixtures')
+    generate_fixtures(fixtures)
+    provider = ReplayProvider(fixtures, latency=UPSTREAM_LATENCY)
+    set_provider(provider)
+
+    results = {}
+    print(f"{'scenario':<46} {'first':>8} {'p50':>7} {'p95':>7} {'calls':>9} {'peak':>8}")
+    for tab, timeframe, interval, size in scenarios(quick):
+        name = f"{tab} | {timeframe}/{interval} | watchlist {size}"
+        result = results[name] = run_scenario(provider, tab, timeframe, interval, size, reruns)
+        print(f"{name:<46} {result['first_ms']:>6.0f}ms {result['rerun_p50_ms']:>5.0f}ms "
+              f"{result['rerun_p95_ms']:>5.0f}ms {result['first_calls']:>4}/{result['rerun_calls']:<4} "
+              f"{result['peak_mb']:>6.1f}MB")
+
+    if '--update-baseline' in argv:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("No baseline stored; run with --update-baseline to create one")
+        return 0
+    with open(BASELINE_PATH) as f:
+        failures = compare(results, json.load(f))
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,265 @@
+"""Micro-benchmarks for the app's data paths.
+
+Run with `python benchmarks.py [name ...]`; with no names every benchmark runs.
+Upstream calls are replaced by stubs with fake latency so results are
+reproducible offline.
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+from backtest import RULES, param_grid, sweep
+from charts import decimate_lines, line_figure
+from db import ConnectionPool
+from history import compact_history, history_nbytes
+from indicators import IndicatorEngine, calculate_technical_indicators, indicators_panel
+from price_store import PriceStore
+from utils import create_candlestick_chart, get_trending_stocks
+
+
+def _stub_info_fetcher(latencies, fail=()):
+    def fetch(symbol):
+        time.sleep(latencies[symbol])
+        if symbol in fail:
+            raise RuntimeError("stubbed upstream failure")
+        return {'shortName': symbol, 'currentPrice': 100.0,
+                'regularMarketChangePercent': 1.0, 'volume': 1000}
+    return fetch
+
+
+def bench_trending_fetch():
+    rng = random.Random(42)
+    symbols = config.TRENDING_SYMBOLS
+    latencies = {s: rng.uniform(0.05, 0.3) for s in symbols}
+    fetch = _stub_info_fetcher(latencies, fail={symbols[-1]})
+
+    start = time.perf_counter()
+    serial = 0
+    for symbol in symbols:
+        try:
+            fetch(symbol)
+            serial += 1
+        except RuntimeError:
+            pass
+    serial_wall = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = get_trending_stocks(fetch=fetch)
+    batched_wall = time.perf_counter() - start
+
+    print(f"trending_fetch: {len(symbols)} symbols, 1 failing")
+    print(f"  sum of call latencies   {sum(latencies.values()):.3f}s")
+    print(f"  slowest single call     {max(latencies.values()):.3f}s")
+    print(f"  serial wall time        {serial_wall:.3f}s ({serial} rows)")
+    print(f"  batched wall time       {batched_wall:.3f}s ({len(df)} rows, "
+          f"{config.FETCH_MAX_WORKERS} workers)")
+
+
+def _stub_history_fetcher(bars, latency_per_bar=2e-5, base_latency=0.05):
+    index = pd.date_range(end=pd.Timestamp.now(tz='America/New_York').normalize(),
+                          periods=bars, freq='B')
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, bars))
+    full = pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': 1e6,
+                         'Dividends': 0.0, 'Stock Splits': 0.0}, index=index)
+    fetched = []
+
+    def fetch(symbol, interval, period=None, start=None):
+        df = full[full.index >= start] if start is not None else full
+        time.sleep(base_latency + latency_per_bar * len(df))
+        fetched.append(len(df) * df.shape[1] * 8)
+        return df
+    return fetch, fetched
+
+
+def bench_price_store():
+    fetch, fetched = _stub_history_fetcher(bars=1260)
+    store = PriceStore(tempfile.mkdtemp(), fetch=fetch, min_refresh=0)
+
+    start = time.perf_counter()
+    store.load('AAPL', '5y', '1d')
+    cold = time.perf_counter() - start
+    cold_bytes = fetched[-1]
+
+    warm = []
+    for _ in range(5):
+        start = time.perf_counter()
+        store.load('AAPL', '5y', '1d')
+        warm.append(time.perf_counter() - start)
+
+    print("price_store: 5y of daily bars, repeated views")
+    print(f"  cold load   {cold * 1000:8.1f} ms  {cold_bytes:>9,} bytes fetched")
+    print(f"  warm load   {np.median(warm) * 1000:8.1f} ms  {fetched[-1]:>9,} bytes fetched")
+
+
+def bench_indicator_panel(bars=1260, symbols=500):
+    rng = np.random.default_rng(0)
+    closes = 100 + np.cumsum(rng.normal(0, 1, (bars, symbols)), axis=0)
+
+    start = time.perf_counter()
+    indicators_panel(closes)
+    panel = time.perf_counter() - start
+
+    frames = [pd.DataFrame({'Close': closes[:, i]}) for i in range(symbols)]
+    start = time.perf_counter()
+    for frame in frames:
+        calculate_technical_indicators(frame)
+    loop = time.perf_counter() - start
+
+    print(f"indicator_panel: {bars} bars x {symbols} symbols")
+    print(f"  per-symbol pandas loop  {loop * 1000:8.1f} ms")
+    print(f"  vectorized panel        {panel * 1000:8.1f} ms")
+
+
+def _synthetic_bars(index):
+    close = 100 + np.cumsum(np.random.default_rng(1).normal(0, 0.2, len(index)))
+    return pd.DataFrame({'Open': close, 'High': close + 0.3, 'Low': close - 0.3,
+                         'Close': close, 'Volume': 1e5}, index=index)
+
+
+def _full_candlestick(df):
+    import plotly.graph_objects as go
+    return go.Figure(data=[go.Candlestick(x=df.index, open=df['Open'], high=df['High'],
+                                          low=df['Low'], close=df['Close'])])
+
+
+def bench_chart_decimation():
+    import plotly.express as px
+    cases = {
+        '5d @ 1m': _synthetic_bars(pd.date_range('2026-01-05 09:30', periods=5 * 390, freq='min')),
+        '5y @ 1d + MAs': _synthetic_bars(pd.date_range('2021-01-01', periods=1260, freq='B')),
+        '60d @ 1m': _synthetic_bars(pd.date_range('2026-01-05 09:30', periods=60 * 390, freq='min')),
+    }
+    print("chart_decimation: figure JSON bytes, full pandas-built vs decimated factory-built")
+    for name, df in cases.items():
+        full = len(_full_candlestick(df).to_json())
+        thinned = len(create_candlestick_chart(df, 'TEST').to_json())
+        print(f"  {name:<14} candlestick {full:>11,} -> {thinned:>9,}")
+
+        columns = ['Close', 'MA20', 'MA50', 'MA200']
+        df = df.assign(MA20=df['Close'].rolling(20).mean(), MA50=df['Close'].rolling(50).mean(),
+                       MA200=df['Close'].rolling(200).mean())
+        full = len(px.line(df, x=df.index, y=columns).to_json())
+        lines = decimate_lines(df, columns)
+        thinned = len(line_figure(lines, columns, 'TEST').to_json())
+        print(f"  {'':<14} MA lines    {full:>11,} -> {thinned:>9,}")
+
+
+def _run_sessions(threads, ops, work):
+    errors = []
+
+    def session(n):
+        rng = random.Random(n)
+        for i in range(ops):
+            try:
+                work(f'user{n}@example.com', f'SYM{rng.randrange(40)}', rng.random() < 0.2)
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+
+    workers = [threading.Thread(target=session, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start, errors
+
+
+def bench_db_concurrency(threads=16, ops=300):
+    create = 'CREATE TABLE IF NOT EXISTS watchlist (email TEXT, symbol TEXT, PRIMARY KEY (email, symbol))'
+    insert = 'INSERT OR IGNORE INTO watchlist (email, symbol) VALUES (?, ?)'
+    select = 'SELECT symbol FROM watchlist WHERE email = ?'
+
+    # The previous pattern: connect per call, default rollback journal, schema on every call
+    legacy_path = os.path.join(tempfile.mkdtemp(), 'legacy.db')
+
+    def legacy(email, symbol, write):
+        conn = sqlite3.connect(legacy_path)
+        try:
+            conn.execute(create)
+            if write:
+                conn.execute(insert, (email, symbol))
+                conn.commit()
+            else:
+                conn.execute(select, (email,)).fetchall()
+        finally:
+            conn.close()
+
+    pool = ConnectionPool(os.path.join(tempfile.mkdtemp(), 'pooled.db'))
+
+    def pooled(email, symbol, write):
+        if write:
+            pool.execute(insert, (email, symbol))
+        else:
+            pool.fetch_all(select, (email,))
+
+    print(f"db_concurrency: {threads} threads x {ops} ops, 20% writes")
+    for name, work in (('connect per call', legacy), ('pooled WAL', pooled)):
+        wall, errors = _run_sessions(threads, ops, work)
+        print(f"  {name:<17} {wall:6.2f}s  {threads * ops / wall:8.0f} ops/s  "
+              f"{len(errors)} 'database is locked' errors")
+
+
+def bench_history_memory():
+    cases = {
+        '5y daily': pd.date_range(end='2026-10-16', periods=1260, freq='B', tz='America/New_York'),
+        '5d 1m': pd.date_range(end='2026-10-16 16:00', periods=5 * 390, freq='min', tz='America/New_York'),
+    }
+    print("history_memory: bytes per cached symbol, bare and with indicator columns")
+    for name, index in cases.items():
+        # The frame yfinance returns, with Dividends and Stock Splits
+        full = _synthetic_bars(index).assign(Dividends=0.0, **{'Stock Splits': 0.0})
+        compact = compact_history(full)
+        print(f"  {name:<9} yfinance frame {history_nbytes(full) / 1024:6.1f} KB, "
+              f"with indicators {history_nbytes(calculate_technical_indicators(full)) / 1024:6.1f} KB | "
+              f"compact ({compact['Close'].dtype}) {history_nbytes(compact) / 1024:6.1f} KB, "
+              f"with indicators {history_nbytes(IndicatorEngine().update(compact)) / 1024:6.1f} KB")
+
+
+def bench_backtest_sweep(bars=1260, symbols=100):
+    rng = np.random.default_rng(0)
+    index = pd.date_range(end='2026-10-16', periods=bars, freq='B')
+    closes = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (bars, symbols)), axis=0)),
+                          index=index, columns=[f'S{i}' for i in range(symbols)])
+    workers = config.BACKTEST_WORKERS
+    print(f"backtest_sweep: {bars} bars x {symbols} symbols, {workers} worker(s)")
+    if workers < 2:
+        print(f"  sweeps run in-process ({config.AVAILABLE_CPUS} CPU(s) available to this process), "
+              f"so there is no parallel run to compare")
+    else:
+        # Start the worker processes outside the timings
+        sweep(closes.iloc[:, :config.BACKTEST_PARALLEL_MIN_SYMBOLS], 'ma_cross')
+    for rule in RULES:
+        combinations = len(param_grid(RULES[rule][3]))
+        timings = {}
+        for count in sorted({1, workers}):
+            start = time.perf_counter()
+            sweep(closes, rule, workers=count)
+            timings[count] = time.perf_counter() - start
+        speedup = f"  {timings[1] / timings[workers]:4.1f}x with {workers} workers" if workers > 1 else ''
+        print(f"  {rule:<9} {combinations:3d} combinations  1 worker {timings[1] * 1000:8.1f} ms{speedup}")
+
+
+BENCHMARKS = {
+    'trending_fetch': bench_trending_fetch,
+    'price_store': bench_price_store,
+    'indicator_panel': bench_indicator_panel,
+    'chart_decimation': bench_chart_decimation,
+    'db_concurrency': bench_db_concurrency,
+    'history_memory': bench_history_memory,
+    'backtest_sweep': bench_backtest_sweep,
+}
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,174 @@
+"""Process-wide TTL + LRU cache for upstream market data.
+
+Module-level state lives for the lifetime of the Streamlit server process, so
+every session and every rerun shares the same entries.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import config
+import metrics
+
+
+class TTLCache:
+    """LRU-bounded mapping whose entries expire after a per-kind TTL.
+
+    Keys are tuples whose second element is the call kind ('quote', 'info',
+    ...), which selects the TTL from `ttls`.
+    """
+
+    def __init__(self, maxsize, ttls, default_ttl=60, stale_ttl=0):
+        self.maxsize = maxsize
+        self.ttls = dict(ttls)
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._loading = {}
+
+    def _count(self, kind, event):
+        counters = self._counters.setdefault(kind, {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0})
+        counters[event] += 1
+
+    def _ttl(self, kind):
+        return self.ttls.get(kind, self.default_ttl)
+
+    def get(self, key):
+        """Return (found, value) without loading anything."""
+        kind = key[1]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count(kind, 'misses')
+                return False, None
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age > self._ttl(kind):
+                # Expired entries linger for stale reads until they are too old or evicted
+                if age > self._ttl(kind) + self.stale_ttl:
+                    del self._entries[key]
+                self._count(kind, 'expirations')
+                self._count(kind, 'misses')
+                return False, None
+            self._entries.move_to_end(key)
+            self._count(kind, 'hits')
+            return True, value
+
+    def peek(self, key):
+        """(value, age in seconds) even if expired, or (None, None); counts nothing."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        value, stored_at = entry
+        age = time.monotonic() - stored_at
+        if age > self._ttl(key[1]) + self.stale_ttl:
+            return None, None
+        return value, age
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                self._count(evicted[1], 'evictions')
+
+    def get_or_load(self, key, loader, wait=config.FETCH_TIMEOUT):
+        """Cached value for `key`, else loader()'s result, stored unless it is None.
+
+        Callers that miss while another thread is loading the same key wait
+        up to `wait` seconds for that load instead of starting their own.
+        """
+        if _refreshing.get():
+            return self._load(key, loader)
+        found, value = self.get(key)
+        if found:
+            return value
+        with self._lock:
+            loading = self._loading.get(key)
+            if loading is None:
+                self._loading[key] = threading.Event()
+        if loading is not None:
+            loading.wait(wait)
+            found, value = self.get(key)
+            if found:
+                return value
+            return self._load(key, loader)
+        try:
+            return self._load(key, loader)
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+    def _load(self, key, loader):
+        # Load outside the lock so slow upstream calls don't serialize sessions
+        value = loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def items(self):
+        """Snapshot of live (key, value) pairs; doesn't touch LRU order or counters."""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (value, stored_at) in self._entries.items()
+                    if now - stored_at <= self._ttl(key[1])]
+
+    def stats(self):
+        """Hit/miss/eviction counters per kind plus current occupancy."""
+        with self._lock:
+            per_kind = {kind: dict(counters) for kind, counters in self._counters.items()}
+            size = len(self._entries)
+        totals = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        for counters in per_kind.values():
+            for event, count in counters.items():
+                totals[event] += count
+        lookups = totals['hits'] + totals['misses']
+        totals['hit_rate'] = totals['hits'] / lookups if lookups else 0.0
+        return {'size': size, 'maxsize': self.maxsize, 'totals': totals, 'kinds': per_kind}
+
+
+_refreshing = ContextVar('refreshing', default=False)
+
+
+@contextmanager
+def refreshing():
+    """Within the block, cached() calls reload and overwrite entries instead of reading them."""
+    token = _refreshing.set(True)
+    try:
+        yield
+    finally:
+        _refreshing.reset(token)
+
+
+market_cache = TTLCache(config.CACHE_MAX_ENTRIES, config.CACHE_TTLS, stale_ttl=config.CACHE_STALE_TTL)
+figure_cache = TTLCache(config.FIGURE_CACHE_MAX_ENTRIES, config.CACHE_TTLS)
+
+
+def cached(kind, symbol, loader, period=None, interval=None):
+    """Serve loader() through the shared cache, keyed on (symbol, kind, period, interval)."""
+    loaded = []
+
+    def load():
+        loaded.append(True)
+        with metrics.timer(f'load.{kind}', symbol):
+            return loader()
+
+    value = market_cache.get_or_load((symbol, kind, period, interval), load)
+    metrics.cache_lookup(kind, symbol, hit=not loaded)
+    return value
+
+
+def stale(kind, symbol, period=None, interval=None):
+    """Last value cached() stored for these arguments, fresh or expired, with its age."""
+    return market_cache.peek((symbol, kind, period, interval))
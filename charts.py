@@ -0,0 +1,208 @@
+"""Plotly figure construction for the dashboard.
+
+Series are decimated server-side first. Line and area traces are thinned
+with Largest-Triangle-Three-Buckets (LTTB), which keeps local peaks and
+troughs. Candlesticks are merged into OHLC buckets (first open, max high,
+min low, last close, summed volume). Point budgets follow the chart width.
+
+Figures are then built by a small factory on a shared layout template,
+from float32 values and epoch-millisecond timestamps. Plotly serializes
+those as compact typed arrays instead of per-point JSON. Finished figures
+are cached as JSON on their inputs, and every caller gets its own figure
+decoded from it, so no session can change another's chart.
+"""
+
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import config
+from cache import figure_cache
+
+# Shared dashboard look, layered over plotly_dark
+pio.templates['dashboard'] = go.layout.Template(layout=go.Layout(
+    plot_bgcolor='rgba(19,47,76,0.8)',
+    paper_bgcolor='rgba(19,47,76,0.8)',
+    hoverlabel=dict(
+        bgcolor="white",
+        font_size=12,
+        font_family="sans-serif"
+    ),
+))
+DASHBOARD_TEMPLATE = 'plotly_dark+dashboard'
+
+
+def line_point_budget(width_px=config.CHART_WIDTH_PX):
+    return int(width_px * config.LINE_POINTS_PER_PX)
+
+
+def candle_point_budget(width_px=config.CHART_WIDTH_PX):
+    return max(1, int(width_px // config.CANDLE_PX))
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the `threshold` points LTTB keeps from (x, y); NaNs are skipped."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if threshold >= n or threshold < 3:
+        return valid
+    x, y = x[valid], y[valid]
+
+    # First and last points are always kept; the rest is split into buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        # Pick the point forming the largest triangle with the previous pick
+        # and the next bucket's average
+        areas = np.abs((x[a] - avg_x) * (y[start:stop] - y[a])
+                       - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        keep[i + 1] = a
+    return valid[keep]
+
+
+def _x_values(index):
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(np.float64)
+    return np.arange(len(index), dtype=np.float64)
+
+
+def decimate_lines(df, columns, threshold=None):
+    """Rows of df that LTTB keeps for any of `columns`, in their original order.
+
+    The budget is split across the columns so the shared rows stay within it.
+    """
+    threshold = threshold or line_point_budget()
+    if len(df) <= threshold:
+        return df
+    x = _x_values(df.index)
+    per_column = max(3, threshold // len(columns))
+    rows = np.unique(np.concatenate([lttb_indices(x, df[column].to_numpy(), per_column)
+                                     for column in columns]))
+    return df.iloc[rows]
+
+
+def decimate_ohlc(df, buckets=None):
+    """Merge consecutive bars into at most `buckets` OHLC bars."""
+    buckets = buckets or candle_point_budget()
+    if len(df) <= buckets:
+        return df
+    starts = np.linspace(0, len(df), buckets, endpoint=False).astype(np.int64)
+    ends = np.append(starts[1:], len(df)) - 1
+    data = {
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(df['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        'Close': df['Close'].to_numpy()[ends],
+    }
+    if 'Volume' in df:
+        data['Volume'] = np.add.reduceat(df['Volume'].to_numpy(), starts)
+    return pd.DataFrame(data, index=df.index[starts])
+
+
+def decimation_report(original_points, kept_points, payload_bytes):
+    """Payload size after decimation and the size the full series would have had."""
+    ratio = original_points / kept_points if kept_points else 1.0
+    return {
+        'points_before': original_points,
+        'points_after': kept_points,
+        'bytes_after': payload_bytes,
+        'bytes_before_estimate': int(payload_bytes * ratio),
+    }
+
+
+def epoch_ms(index):
+    """Wall-clock epoch milliseconds for a DatetimeIndex (exchange-local time, as plotted before)."""
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.asi8 / 1e6
+
+
+def _values(series):
+    return series.to_numpy(dtype=np.float32)
+
+
+def make_figure(traces, title, **layout):
+    # x values are epoch milliseconds, so the axis type has to be set explicitly
+    return go.Figure(data=traces, layout=go.Layout(title=title, template=DASHBOARD_TEMPLATE,
+                                                   xaxis_type='date', **layout))
+
+
+def line_figure(df, columns, title, fill=None, hlines=()):
+    """Line figure with one trace per column, sharing df's index as x."""
+    x = epoch_ms(df.index)
+    traces = [go.Scatter(x=x, y=_values(df[column]), mode='lines', name=column, fill=fill)
+              for column in columns]
+    fig = make_figure(traces, title, showlegend=len(columns) > 1)
+    for y, color in hlines:
+        fig.add_hline(y=y, line_dash="dash", line_color=color)
+    return fig
+
+
+def heatmap_figure(matrix, title, zmin=-1, zmax=1):
+    """Square heatmap of a symbol x symbol frame, e.g. a correlation matrix."""
+    labels = list(matrix.columns)
+    trace = go.Heatmap(z=matrix.to_numpy(dtype=np.float32), x=labels, y=labels, zmin=zmin, zmax=zmax,
+                       colorscale='RdBu', reversescale=True, hoverongaps=False)
+    return go.Figure(data=[trace], layout=go.Layout(title=title, template=DASHBOARD_TEMPLATE,
+                                                    yaxis_autorange='reversed', height=max(400, 18 * len(labels))))
+
+
+def price_figure(df, symbol, chart_type='candlestick'):
+    # Thin the series to what the chart width can show before building traces
+    if chart_type == 'candlestick':
+        df = decimate_ohlc(df)
+        traces = [go.Candlestick(x=epoch_ms(df.index),
+                                 open=_values(df['Open']),
+                                 high=_values(df['High']),
+                                 low=_values(df['Low']),
+                                 close=_values(df['Close']))]
+    else:
+        df = decimate_lines(df, ['Close'])
+        traces = [go.Scatter(x=epoch_ms(df.index), y=_values(df['Close']),
+                             mode='lines', fill='tozeroy' if chart_type == 'area' else None)]
+    return make_figure(traces, f'{symbol} Stock Price',
+                       yaxis_title='Price', xaxis_rangeslider_visible=False)
+
+
+def figure_points(fig):
+    """Points in a figure's first trace; x may be a plotly typed array."""
+    x = fig.data[0].x if fig.data else ()
+    if isinstance(x, dict):
+        return len(base64.b64decode(x['bdata'])) // np.dtype(x['dtype']).itemsize
+    return len(x)
+
+
+def _data_version(df):
+    # A digest of every row, so a re-adjustment that rewrites past bars counts as new data
+    return (len(df), int(pd.util.hash_pandas_object(df).sum()))
+
+
+def figure_from_json(text):
+    """A new figure decoded from plotly JSON that an existing figure produced."""
+    # The JSON came from a built figure, so it needs no second validation pass
+    return go.Figure(json.loads(text), _validate=False)
+
+
+def cached_figure_json(symbol, name, df, build, *params):
+    """Plotly JSON of a figure built once per (symbol, chart, params, data version) for all sessions."""
+    key = (symbol, 'figure', name, params, _data_version(df))
+    return figure_cache.get_or_load(key, lambda: pio.to_json(build(), validate=False))
+
+
+def cached_figure(symbol, name, df, build, *params):
+    """cached_figure_json decoded into a new figure on each call."""
+    return figure_from_json(cached_figure_json(symbol, name, df, build, *params))
@@ -0,0 +1,134 @@
+"""Multi-symbol comparison analytics.
+
+Every symbol's closes share one aligned time x symbol matrix, so returns,
+correlations and relative-strength rankings are single NumPy expressions
+over its values rather than per-symbol loops.
+"""
+
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import config
+
+TRADING_DAYS = 252
+SESSION_MINUTES = 390
+BARS_PER_YEAR = {'1d': TRADING_DAYS, '5d': TRADING_DAYS / 5, '1wk': 52, '1mo': 12, '3mo': 4}
+
+
+def parse_symbols(text, limit=config.COMPARE_MAX_SYMBOLS):
+    """Unique upper-cased tickers from comma/space separated text, in input order."""
+    symbols = dict.fromkeys(token.upper() for token in re.split(r'[\s,;]+', text) if token)
+    return list(symbols)[:limit]
+
+
+def align(closes, fill=True):
+    """Time-sorted matrix with one row per timestamp and no empty columns or rows.
+
+    With `fill`, gaps inside a symbol's history carry its last price
+    forward; bars before a symbol's first price stay NaN either way.
+    """
+    matrix = closes.sort_index()
+    matrix = matrix[~matrix.index.duplicated(keep='last')]
+    matrix = matrix.dropna(axis=1, how='all').dropna(how='all')
+    return matrix.ffill() if fill else matrix
+
+
+def bars_per_year(interval):
+    if interval.endswith('m') and interval[:-1].isdigit():
+        return TRADING_DAYS * SESSION_MINUTES / int(interval[:-1])
+    if interval.endswith('h') and interval[:-1].isdigit():
+        return TRADING_DAYS * SESSION_MINUTES / (60 * int(interval[:-1]))
+    return BARS_PER_YEAR.get(interval, TRADING_DAYS)
+
+
+def normalized_returns(values):
+    """Cumulative return of each column since its first valid price."""
+    first = (~np.isnan(values)).argmax(axis=0)
+    return values / values[first, np.arange(values.shape[1])] - 1
+
+
+def last_valid(values):
+    """Last non-NaN value in each column; NaN for a column with none."""
+    valid = ~np.isnan(values)
+    if not valid.size:
+        return np.full(values.shape[1], np.nan)
+    rows = len(values) - 1 - valid[::-1].argmax(axis=0)
+    return np.where(valid.any(axis=0), values[rows, np.arange(values.shape[1])], np.nan)
+
+
+def bar_returns(values, observed=None):
+    """Log return per bar; NaN where either end is missing or not positive.
+
+    With forward-filled `values`, pass the `observed` mask of real prices:
+    a filled bar then has no return instead of a zero one, and the bar after
+    a gap gets the whole move since the last real price.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(np.where(values > 0, values, np.nan)), axis=0)
+    if observed is not None:
+        returns[~observed[1:]] = np.nan
+    return returns
+
+
+def correlation(returns):
+    """Pairwise-complete Pearson correlation of the columns of `returns`.
+
+    Each pair uses only the rows where both columns are present, so symbols
+    with shorter histories don't truncate everyone else's sample.
+    """
+    mask = (~np.isnan(returns)).astype(np.float64)
+    x = np.where(mask > 0, returns, 0.0)
+    n = mask.T @ mask
+    sum_x = x.T @ mask                 # [i, j]: sum of column i where j is present too
+    sum_xx = (x * x).T @ mask
+    sum_xy = x.T @ x
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var = sum_xx - sum_x ** 2 / n
+        corr = cov / np.sqrt(var * var.T)
+    corr[n < 2] = np.nan
+    np.fill_diagonal(corr, 1.0)
+    return np.clip(corr, -1.0, 1.0)
+
+
+def rankings(values, returns, symbols, interval):
+    """Return, volatility and relative strength per symbol, strongest first.
+
+    Relative strength is growth over the period against the equal-weight
+    average of the group: above 1 means the symbol beat its peers.
+    """
+    last = last_valid(normalized_returns(values))
+    with warnings.catch_warnings():
+        # A symbol with no returns gets NaN volatility without a warning
+        warnings.simplefilter('ignore', RuntimeWarning)
+        volatility = np.nanstd(returns, axis=0) * np.sqrt(bars_per_year(interval))
+    # Symbols without data get NaN figures and don't move the group average
+    traded = last[~np.isnan(last)]
+    strength = (1 + last) / (1 + traded.mean()) if len(traded) else last
+    table = pd.DataFrame({
+        'Return': last,
+        'Volatility': volatility,
+        'Relative Strength': strength,
+    }, index=pd.Index(symbols, name='Symbol'))
+    table = table.sort_values('Relative Strength', ascending=False)
+    table.insert(0, 'Rank', np.arange(1, len(table) + 1))
+    return table
+
+
+def compare(closes, interval='1d'):
+    """Align `closes` and derive everything the comparison view shows."""
+    raw = align(closes, fill=False)
+    matrix = raw.ffill()
+    values = matrix.to_numpy(dtype=np.float64)
+    # Statistics only use bars where a symbol actually traded
+    returns = bar_returns(values, raw.notna().to_numpy())
+    symbols = list(matrix.columns)
+    return {
+        'matrix': matrix,
+        'normalized': pd.DataFrame(normalized_returns(values) * 100, index=matrix.index, columns=symbols),
+        'correlation': pd.DataFrame(correlation(returns), index=symbols, columns=symbols),
+        'rankings': rankings(values, returns, symbols, interval),
+    }
@@ -0,0 +1,113 @@
+"""Tunable settings for the stock analysis app"""
+
+import os
+
+# Upstream fetches
+FETCH_MAX_WORKERS = 20  # enough to fan out the whole trending list at once
+FETCH_TIMEOUT = 10  # seconds allowed per symbol once its fetch has started
+
+TRENDING_SYMBOLS = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA', 'JPM', 'V', 'WMT',
+                    'DIS', 'NFLX', 'PYPL', 'INTC', 'AMD', 'BAC', 'KO', 'PEP', 'NKE']
+
+# Shared market data cache
+CACHE_MAX_ENTRIES = 512
+CACHE_TTLS = {
+    'quote': 30,        # price-bearing info snapshots (metrics, trending cards)
+    'history': 60,      # OHLCV bars
+    'news': 15 * 60,
+    'info': 6 * 3600,   # company profile fields
+    'figure': 10 * 60,  # built plotly figures, keyed on their input data version
+}
+CACHE_STALE_TTL = 3600  # expired entries stay readable this long as a fallback
+FIGURE_CACHE_MAX_ENTRIES = 64  # figure JSON is kept apart so it can't evict market data
+SHOW_CACHE_STATS = os.environ.get('SHOW_CACHE_STATS') == '1'
+
+# Dashboard rendering
+LAZY_TABS = True  # render only the selected section instead of all tabs
+# Start a section's fetches together and fill placeholders as results arrive
+ASYNC_RENDER = os.environ.get('ASYNC_RENDER', '1') == '1'
+ASYNC_FETCH_TIMEOUT = 5  # seconds before a placeholder falls back to stale data
+
+# Local OHLCV store
+PRICE_STORE_DIR = os.environ.get('PRICE_STORE_DIR', '.price_store')
+PRICE_STORE_MIN_REFRESH = 30  # seconds between upstream syncs of one (symbol, interval)
+PRICE_STORE_MAX_PARTS = 16  # appended parts per series before they are compacted into one
+PRICE_STORE_INTRADAY_DAYS = 60  # intraday bars older than this are dropped
+
+# Cached history frames hold float32 prices unless a price is too large for cent precision
+HISTORY_FLOAT32 = os.environ.get('HISTORY_FLOAT32', '1') == '1'
+
+# Incremental indicator engines kept in memory, one per (symbol, period, interval)
+INDICATOR_ENGINES_MAX = 256
+
+# Chart decimation: point budgets follow the rendered chart width
+CHART_WIDTH_PX = 1400
+LINE_POINTS_PER_PX = 1    # LTTB target for line/area traces
+CANDLE_PX = 4             # minimum horizontal pixels per candlestick
+SHOW_CHART_PAYLOAD = os.environ.get('SHOW_CHART_PAYLOAD') == '1'
+
+# SQLite
+DB_PATH = os.environ.get('DB_PATH', 'users.db')
+DB_POOL_SIZE = 8
+DB_BUSY_TIMEOUT = 5  # seconds to wait on a locked database or an exhausted pool
+WATCHLIST_MAX_SYMBOLS = 500  # cap on symbols taken from one CSV import
+
+# Sidebar watchlist quotes panel; 0 turns auto-refresh off
+QUOTES_REFRESH_SECONDS = int(os.environ.get('QUOTES_REFRESH_SECONDS', '30'))
+
+# Local news index (SQLite FTS5), refilled from upstream per symbol at most this often
+NEWS_DB_PATH = os.environ.get('NEWS_DB_PATH', 'news.db')
+NEWS_REFRESH_INTERVAL = 900
+NEWS_PAGE_SIZE = 10
+NEWS_RETENTION_DAYS = 30
+
+# Comparison view: tickers fetched together in one batched request
+COMPARE_MAX_SYMBOLS = 50
+
+# Backtests: cost per change of position and the process pool for parameter sweeps
+BACKTEST_COST_BPS = 5
+# CPUs this process may run on, which can be fewer than the machine has
+AVAILABLE_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+BACKTEST_WORKERS = int(os.environ.get('BACKTEST_WORKERS', AVAILABLE_CPUS))
+BACKTEST_PARALLEL_MIN_SYMBOLS = 4  # smaller sweeps run in-process
+BACKTEST_SWEEP_ROWS = 50  # best results shown
+
+# Screener: universe CSV (Symbol,Name,Sector) and its persisted indicator index
+SCREENER_UNIVERSE = os.environ.get('SCREENER_UNIVERSE', 'universe.csv')
+SCREENER_INDEX_PATH = os.environ.get('SCREENER_INDEX_PATH', os.path.join(PRICE_STORE_DIR, 'screener_index.parquet'))
+SCREENER_PERIOD = '1y'              # enough daily bars for MA200
+SCREENER_REFRESH_INTERVAL = 900     # seconds between index refreshes
+SCREENER_INFO_MAX_AGE = 6 * 60 * 60  # re-read PE / market cap after this long
+SCREENER_RESULTS_LIMIT = 200
+
+MARKET_INDICES = {'^GSPC': 'S&P 500', '^DJI': 'Dow Jones', '^IXIC': 'NASDAQ'}
+
+# Market Overview: one snapshot shared by every session, persisted for warm starts
+OVERVIEW_REFRESH_INTERVAL = 30  # seconds; matches the 'quote' cache TTL
+OVERVIEW_SNAPSHOT_PATH = os.environ.get('OVERVIEW_SNAPSHOT_PATH', os.path.join(PRICE_STORE_DIR, 'overview_snapshot.json'))
+OVERVIEW_SNAPSHOT_MAX_AGE = 6 * 60 * 60  # seconds; an older file is not shown after a restart
+
+# Background prefetch of trending quotes, index histories and watchlist quotes
+PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', '1') == '1'
+PREFETCH_INTERVAL = 20      # seconds; keep below the 'quote' cache TTL
+PREFETCH_JITTER = 0.2       # +/- fraction applied to every delay
+PREFETCH_MAX_BACKOFF = 600  # seconds between retries while upstream keeps failing
+PREFETCH_IDLE_AFTER = 300   # seconds without a rendered session before prefetch pauses
+
+# Market data backend: 'yfinance' (live) or 'replay' (recorded fixtures)
+MARKET_DATA_PROVIDER = os.environ.get('MARKET_DATA_PROVIDER', 'yfinance')
+REPLAY_DIR = os.environ.get('REPLAY_DIR', 'fixtures')
+REPLAY_LATENCY = float(os.environ.get('REPLAY_LATENCY', '0'))
+REPLAY_ERROR_RATE = float(os.environ.get('REPLAY_ERROR_RATE', '0'))
+REPLAY_SEED = int(os.environ.get('REPLAY_SEED', '0'))
+
+# Instrumentation: Prometheus text on http://METRICS_HOST:METRICS_PORT/metrics
+# and/or rewritten to METRICS_FILE every METRICS_FILE_INTERVAL seconds (0/'' = off)
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '0'))
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_FILE = os.environ.get('METRICS_FILE', '')
+METRICS_FILE_INTERVAL = 15
+METRICS_MAX_SYMBOLS = 500  # distinct symbol labels before folding into 'other'
+
+# Users who see the metrics panel in the sidebar (comma-separated emails)
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()}
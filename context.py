@@ -0,0 +1,96 @@
+"""Request-scoped access to per-symbol market data.
+
+A PageContext is created once per script rerun. Each symbol's quote info,
+history and news are loaded lazily on first use and then handed to every
+tab that asks for them, so one page view makes at most one upstream call
+per distinct resource.
+"""
+
+from concurrent.futures import Future
+
+from utils import (
+    get_stock_history, get_stock_quote, get_company_info, company_info_from,
+    get_stock_news, get_trending_infos, trending_frame, submit_fetch
+)
+
+_MISSING = object()
+
+
+class SymbolContext:
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self._info = _MISSING
+        self._info_future = None
+        self._company_info = _MISSING
+        self._news = _MISSING
+        self._history = {}
+
+    @property
+    def info(self):
+        if self._info is _MISSING:
+            if self._info_future is not None:
+                self._info = self._info_future.result()
+            else:
+                self._info = get_stock_quote(self.symbol)
+        return self._info
+
+    def fetch_info(self):
+        """Start loading the quote on the fetch pool and return its Future.
+
+        info and company_info then wait for this fetch instead of making
+        their own upstream call.
+        """
+        if self._info_future is None:
+            if self._info is _MISSING:
+                self._info_future = submit_fetch(get_stock_quote, self.symbol)
+            else:
+                self._info_future = Future()
+                self._info_future.set_result(self._info)
+        return self._info_future
+
+    @property
+    def company_info(self):
+        if self._company_info is _MISSING:
+            # Reuse a quote snapshot loaded (or loading) this rerun; otherwise
+            # fall back to the long-lived company profile cache
+            info = self.info if self._info_future is not None else self._info
+            if info is not _MISSING and info is not None:
+                self._company_info = company_info_from(info)
+            else:
+                self._company_info = get_company_info(self.symbol)
+        return self._company_info
+
+    @property
+    def news(self):
+        if self._news is _MISSING:
+            self._news = get_stock_news(self.symbol)
+        return self._news
+
+    def history(self, period='1y', interval='1d'):
+        key = (period, interval)
+        if key not in self._history:
+            self._history[key] = get_stock_history(self.symbol, period, interval)
+        return self._history[key]
+
+    def seed_info(self, info):
+        if self._info is _MISSING:
+            self._info = info
+
+
+class PageContext:
+    def __init__(self):
+        self._symbols = {}
+        self._trending = None
+
+    def symbol(self, symbol):
+        if symbol not in self._symbols:
+            self._symbols[symbol] = SymbolContext(symbol)
+        return self._symbols[symbol]
+
+    def trending(self):
+        if self._trending is None:
+            infos = get_trending_infos()
+            for symbol, info in infos.items():
+                self.symbol(symbol).seed_info(info)
+            self._trending = trending_frame(infos)
+        return self._trending
@@ -0,0 +1,134 @@
+"""Shared SQLite access layer for accounts, watchlists and the news index.
+
+Connections are pooled and handed to one thread at a time. They run in WAL
+journal mode with a busy timeout, so readers never block the writer and a
+briefly locked database is waited on instead of failing. SQL text is
+reused verbatim, which lets sqlite3's per-connection statement cache serve
+prepared statements. Schema setup runs once per process; a schema entry is
+either SQL or a function that migrates an existing database in place.
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import config
+from metrics import timed
+
+def _watchlist_positions(conn):
+    # Databases created before watchlists were ordered keep their insertion order
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(watchlist)')]
+    if 'position' not in columns:
+        conn.execute('ALTER TABLE watchlist ADD COLUMN position INTEGER')
+        conn.execute('UPDATE watchlist SET position = rowid')
+
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS users
+       (email TEXT PRIMARY KEY, password TEXT)''',
+    '''CREATE TABLE IF NOT EXISTS watchlist
+       (email TEXT, symbol TEXT,
+        PRIMARY KEY (email, symbol))''',
+    _watchlist_positions,
+]
+
+
+class ConnectionPool:
+    def __init__(self, path, schema=SCHEMA, size=config.DB_POOL_SIZE, busy_timeout=config.DB_BUSY_TIMEOUT):
+        self.path = path
+        self.schema = schema
+        self.size = size
+        self.busy_timeout = busy_timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                               check_same_thread=False, cached_statements=256)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+        return conn
+
+    def ensure_schema(self):
+        if self._schema_ready:
+            return
+        with self._lock:
+            if self._schema_ready:
+                return
+            conn = self._connect()
+            try:
+                with conn:
+                    for statement in self.schema:
+                        if callable(statement):
+                            statement(conn)
+                        else:
+                            conn.execute(statement)
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.busy_timeout)
+        except queue.Empty:
+            # Same error a busy database raises, so callers handle one type
+            raise sqlite3.OperationalError(
+                f"no pooled connection free after {self.busy_timeout}s ({self.size} in use)") from None
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of the block."""
+        self.ensure_schema()
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection and commit on success, roll back on error."""
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    @timed('db.fetch_one', symbol_arg=None)
+    def fetch_one(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    @timed('db.fetch_all', symbol_arg=None)
+    def fetch_all(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    @timed('db.execute', symbol_arg=None)
+    def execute(self, sql, params=()):
+        with self.transaction() as conn:
+            return conn.execute(sql, params).rowcount
+
+
+pool = ConnectionPool(config.DB_PATH)
@@ -0,0 +1,76 @@
+"""Non-blocking section rendering.
+
+A section submits all of its upstream fetches at once and reserves an
+st.empty placeholder for each result. The rest of the page renders
+straight away; drain() then fills the placeholders in completion order.
+A fetch that fails, or is still running at its deadline, is rendered from
+the stale cache entry if one exists. An overdue fetch that has not started
+yet is cancelled so it stops holding a place in the pool; one already
+running keeps going and warms the cache for the next rerun.
+
+With ASYNC_RENDER off, each placeholder is filled as soon as it is
+reserved. The fetches still run concurrently, but the page waits for each
+one in order.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import streamlit as st
+
+import config
+
+
+class DeferredRenders:
+    def __init__(self, enabled=config.ASYNC_RENDER, timeout=config.ASYNC_FETCH_TIMEOUT):
+        self.enabled = enabled
+        self.timeout = timeout
+        self._pending = []
+
+    def defer(self, future, render, stale=None, placeholder=None):
+        """Call render(result) inside a placeholder once `future` completes.
+
+        `stale()` returns (value, age_seconds) or (None, None) and is used when
+        the fetch fails, returns None, or misses its deadline. `placeholder`
+        defaults to a new st.empty() at the current position.
+        """
+        placeholder = placeholder or st.empty()
+        slot = (placeholder, future, render, stale, time.monotonic() + self.timeout)
+        if not self.enabled:
+            wait([future], timeout=self.timeout)
+            self._fill(slot)
+            return
+        placeholder.caption("⏳ Loading...")
+        self._pending.append(slot)
+
+    def drain(self):
+        """Fill every pending placeholder, fastest fetch first, until all are done or overdue."""
+        pending = self._pending
+        self._pending = []
+        while pending:
+            remaining = min(slot[4] for slot in pending) - time.monotonic()
+            wait([slot[1] for slot in pending], timeout=max(0, remaining), return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            ready = [slot for slot in pending if slot[1].done() or now >= slot[4]]
+            for slot in ready:
+                self._fill(slot)
+                slot[1].cancel()
+            pending = [slot for slot in pending if slot not in ready]
+
+    def _fill(self, slot):
+        placeholder, future, render, stale, _ = slot
+        value, age = None, None
+        if future.done():
+            try:
+                value = future.result()
+            except Exception as e:
+                print(f"Deferred fetch failed: {str(e)}")
+        if value is None and stale is not None:
+            value, age = stale()
+        with placeholder.container():
+            if value is None:
+                st.caption("⚠️ Data unavailable right now")
+                return
+            if age is not None:
+                st.caption(f"⏳ Showing data from {age / 60:.0f} min ago while it refreshes")
+            render(value)
@@ -0,0 +1,75 @@
+"""Compact, shared price history frames.
+
+A history frame served from the cache keeps only the OHLCV columns. The
+prices are one read-only 2D block, float32 when they allow it, and Volume
+is a read-only float64 column, since share counts pass float32's 2**24
+integer range on any liquid symbol. Its index is a
+DatetimeIndex, i.e. int64 epoch nanoseconds. Every session then reads the
+same frame: writing into it raises, and adding indicator columns always
+produces a new frame.
+"""
+
+import numpy as np
+import pandas as pd
+
+import config
+from cache import market_cache
+from providers import HISTORY_COLUMNS
+
+# float32 keeps 24 bits of mantissa: below 2**17 its spacing is under a
+# cent, so a stored price still rounds back to the cent it was
+FLOAT32_MAX_PRICE = 2 ** 17
+PRICE_COLUMNS = HISTORY_COLUMNS[:4]
+
+
+def history_dtype(df):
+    """float32 if enabled and every price still resolves to the cent, else float64."""
+    if not config.HISTORY_FLOAT32 or len(df) == 0:
+        return np.float64
+    prices = df[PRICE_COLUMNS].to_numpy()
+    return np.float32 if np.nanmax(np.abs(prices), initial=0) < FLOAT32_MAX_PRICE else np.float64
+
+
+def compact_history(df, dtype=None):
+    """Immutable OHLCV copy of `df`: one contiguous price array plus Volume."""
+    if df is None:
+        return None
+    dtype = dtype or history_dtype(df)
+    df = df.reindex(columns=HISTORY_COLUMNS)
+    prices = np.ascontiguousarray(df[PRICE_COLUMNS].to_numpy(dtype=dtype))
+    prices.flags.writeable = False
+    volume = df['Volume'].to_numpy(dtype=np.float64, copy=True)
+    volume.flags.writeable = False
+    compact = pd.concat([pd.DataFrame(prices, index=df.index, columns=PRICE_COLUMNS, copy=False),
+                         pd.DataFrame({'Volume': volume}, index=df.index, copy=False)], axis=1, copy=False)
+    compact.index.name = df.index.name
+    return compact
+
+
+def history_nbytes(df):
+    """Bytes held by the frame's values and index."""
+    return int(df.memory_usage(index=True).sum())
+
+
+def history_memory_report():
+    """Rows and bytes of every history frame in the shared cache, largest first.
+
+    `float64_bytes` is what the same rows take as yfinance's frame (seven
+    float64 columns with Dividends and Stock Splits, plus the index).
+    """
+    rows = []
+    for key, value in market_cache.items():
+        if key[1] != 'history' or not isinstance(key[0], str) or not isinstance(value, pd.DataFrame):
+            continue
+        symbol, _, period, interval = key
+        rows.append({
+            'symbol': symbol,
+            'period': period,
+            'interval': interval,
+            'rows': len(value),
+            'dtype': str(value['Close'].dtype) if len(value.columns) else '',
+            'bytes': history_nbytes(value),
+            'float64_bytes': len(value) * 8 * (len(HISTORY_COLUMNS) + 3),
+        })
+    rows.sort(key=lambda row: row['bytes'], reverse=True)
+    return rows
@@ -0,0 +1,387 @@
+"""Technical indicators: a pure batch mode, an incremental engine and a panel mode.
+
+The incremental engine keeps running state (rolling sums, EMA values, the
+previous close) per series, so a rerun that only brings new bars costs
+O(new bars) instead of a full recompute over the history. The panel mode
+computes every indicator for a whole (time x symbol) matrix of closes in
+one vectorized NumPy pass.
+"""
+
+import copy
+import math
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+import config
+from metrics import timed, timer
+
+INDICATOR_COLUMNS = ['MA20', 'MA50', 'MA200', 'RSI', 'MACD', 'Signal_Line',
+                     'BB_middle', 'BB_upper', 'BB_lower']
+
+
+# Indicator dependency graph: node -> (inputs, function of the input values).
+# Shared intermediates (the 20-bar window, price diff, EMAs) are nodes of their
+# own, so each is computed once no matter how many indicators use it.
+_GRAPH = {
+    'window20': (('Close',), lambda close: close.rolling(window=20)),
+    'mean20': (('window20',), lambda window: window.mean()),
+    'std20': (('window20',), lambda window: window.std()),
+    'delta': (('Close',), lambda close: close.diff()),
+    'avg_gain': (('delta',), lambda delta: delta.where(delta > 0, 0).rolling(window=14).mean()),
+    'avg_loss': (('delta',), lambda delta: (-delta.where(delta < 0, 0)).rolling(window=14).mean()),
+    'ema12': (('Close',), lambda close: close.ewm(span=12, adjust=False).mean()),
+    'ema26': (('Close',), lambda close: close.ewm(span=26, adjust=False).mean()),
+
+    'MA20': (('mean20',), lambda mean: mean),
+    'MA50': (('Close',), lambda close: close.rolling(window=50).mean()),
+    'MA200': (('Close',), lambda close: close.rolling(window=200).mean()),
+    'RSI': (('avg_gain', 'avg_loss'), lambda gain, loss: 100 - (100 / (1 + gain / loss))),
+    'MACD': (('ema12', 'ema26'), lambda fast, slow: fast - slow),
+    'Signal_Line': (('MACD',), lambda macd: macd.ewm(span=9, adjust=False).mean()),
+    'BB_middle': (('mean20',), lambda mean: mean),
+    'BB_upper': (('mean20', 'std20'), lambda mean, std: mean + 2 * std),
+    'BB_lower': (('mean20', 'std20'), lambda mean, std: mean - 2 * std),
+}
+
+
+def _evaluate(node, values):
+    if node not in values:
+        inputs, fn = _GRAPH[node]
+        values[node] = fn(*(_evaluate(name, values) for name in inputs))
+    return values[node]
+
+
+@timed('calculate_technical_indicators', symbol_arg=None)
+def calculate_technical_indicators(df, indicators=None):
+    """Return a new frame with indicator columns added; `df` is left untouched.
+
+    `indicators` selects a subset of INDICATOR_COLUMNS (default: all), and
+    only the intermediates those need are computed.
+    """
+    if df is None or len(df) == 0:
+        return None
+
+    names = INDICATOR_COLUMNS if indicators is None else [name for name in INDICATOR_COLUMNS if name in indicators]
+    unknown = set(indicators or ()) - set(INDICATOR_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown indicators: {sorted(unknown)}")
+
+    values = {'Close': df['Close']}
+    df = df.copy()
+    for name in names:
+        df[name] = _evaluate(name, values)
+    return df
+
+
+class _RollingWindow:
+    # Adding and subtracting leaves rounding error in the running sums;
+    # they are recomputed from the window's values after this many pushes
+    RESUM_EVERY = 1000
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.pushes = 0
+
+    def push(self, x):
+        self.values.append(x)
+        self.total += x
+        self.total_sq += x * x
+        if len(self.values) > self.size:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        self.pushes += 1
+        if self.pushes % self.RESUM_EVERY == 0:
+            self.total = math.fsum(self.values)
+            self.total_sq = math.fsum(x * x for x in self.values)
+
+    def mean(self):
+        if len(self.values) < self.size:
+            return math.nan
+        return self.total / self.size
+
+    def std(self):
+        if len(self.values) < self.size:
+            return math.nan
+        n = self.size
+        variance = (self.total_sq - self.total * self.total / n) / (n - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class _Ema:
+    def __init__(self, span):
+        self.alpha = 2 / (span + 1)
+        self.value = None
+
+    def push(self, x):
+        # Same recursion as pandas ewm(adjust=False)
+        self.value = x if self.value is None else (1 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+class _IndicatorState:
+    def __init__(self):
+        self.ma20 = _RollingWindow(20)
+        self.ma50 = _RollingWindow(50)
+        self.ma200 = _RollingWindow(200)
+        self.gains = _RollingWindow(14)
+        self.losses = _RollingWindow(14)
+        self.ema12 = _Ema(12)
+        self.ema26 = _Ema(26)
+        self.signal = _Ema(9)
+        self.prev_close = None
+
+    def step(self, close):
+        # The first bar has no change; the batch version counts it as a zero gain/loss
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        for window in (self.ma20, self.ma50, self.ma200):
+            window.push(close)
+        self.gains.push(delta if delta > 0 else 0.0)
+        self.losses.push(-delta if delta < 0 else 0.0)
+
+        gain, loss = self.gains.mean(), self.losses.mean()
+        if math.isnan(gain) or (gain == 0 and loss == 0):
+            rsi = math.nan
+        elif loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + gain / loss)
+
+        macd = self.ema12.push(close) - self.ema26.push(close)
+        signal = self.signal.push(macd)
+
+        ma20 = self.ma20.mean()
+        band = 2 * self.ma20.std()
+        return (ma20, self.ma50.mean(), self.ma200.mean(), rsi, macd, signal,
+                ma20, ma20 + band, ma20 - band)
+
+
+class IndicatorEngine:
+    """Incremental indicators over one growing price series.
+
+    Every bar but the last is committed into the running state. The last
+    bar is evaluated on a copy of that state, because it may still be
+    forming and be revised on the next fetch. A series whose window slides
+    forward (a fixed period a day later) still continues the state: bars
+    that fell out of the window only stop being returned.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._state = _IndicatorState()
+        self._rows = np.empty((0, len(INDICATOR_COLUMNS)))
+        self._count = 0
+        self._index = None
+        self._last_close = None
+
+    def _overlap(self, index, close):
+        """Committed bars that precede `index[0]`, or None if `index` doesn't continue them."""
+        n = self._count
+        if n == 0:
+            return None
+        start = self._index.searchsorted(index[0])
+        if start >= n or self._index[start] != index[0]:
+            return None
+        end = n - start
+        # The newest committed bar must still be there with the same close
+        if len(index) <= end or index[end - 1] != self._index[-1] or close[end - 1] != self._last_close:
+            return None
+        return start
+
+    def _drop(self, count):
+        self._rows[:self._count - count] = self._rows[count:self._count]
+        self._count -= count
+        self._index = self._index[count:]
+
+    def _commit(self, index, close, start, stop):
+        if stop > len(self._rows):
+            grown = np.empty((max(stop, 2 * len(self._rows)), len(INDICATOR_COLUMNS)))
+            grown[:self._count] = self._rows[:self._count]
+            self._rows = grown
+        for i in range(start, stop):
+            self._rows[i] = self._state.step(close[i])
+        self._count = stop
+        self._index = index[:stop]
+        self._last_close = close[stop - 1]
+
+    def update(self, df):
+        """Return a new frame of `df` plus indicator columns, reusing prior state."""
+        if df is None or len(df) == 0:
+            return None
+        index = df.index
+        close = df['Close'].to_numpy(dtype=np.float64)
+        dropped = self._overlap(index, close)
+        if dropped is None:
+            self.reset()
+        elif dropped:
+            self._drop(dropped)
+        if len(close) > 1 and self._count < len(close) - 1:
+            self._commit(index, close, self._count, len(close) - 1)
+
+        last_row = copy.deepcopy(self._state).step(close[-1])
+        values = np.vstack([self._rows[:len(close) - 1], last_row])
+        # Match the history's precision (float32 for compact cached frames)
+        indicators = pd.DataFrame(values.astype(df['Close'].dtype, copy=False), index=index,
+                                  columns=INDICATOR_COLUMNS)
+        return pd.concat([df.drop(columns=INDICATOR_COLUMNS, errors='ignore'), indicators], axis=1)
+
+
+def _prefix_sum(values):
+    out = np.empty((len(values) + 1,) + values.shape[1:])
+    out[0] = 0.0
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+class _PrefixSums:
+    """Cumulative sums of one (time x symbol) array, shared by every window length."""
+
+    def __init__(self, values, squares=False):
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+        self.length = len(values)
+        self.sums = _prefix_sum(filled)
+        self.sums_sq = _prefix_sum(filled * filled) if squares else None
+        self.counts = _prefix_sum(valid) if not valid.all() else None
+
+    def _window(self, prefix, window):
+        return prefix[window:] - prefix[:-window]
+
+    def mean_std(self, window, with_std=False):
+        shape = (self.length,) + self.sums.shape[1:]
+        mean = np.full(shape, np.nan)
+        std = np.full(shape, np.nan) if with_std else None
+        if self.length < window:
+            return mean, std
+        sums = self._window(self.sums, window)
+        mean[window - 1:] = sums / window
+        if with_std:
+            variance = (self._window(self.sums_sq, window) - sums * sums / window) / (window - 1)
+            std[window - 1:] = np.sqrt(np.maximum(variance, 0.0))
+        if self.counts is not None:
+            # Like pandas, a window with any missing bar has no value
+            partial = self._window(self.counts, window) < window
+            mean[window - 1:][partial] = np.nan
+            if with_std:
+                std[window - 1:][partial] = np.nan
+        return mean, std
+
+
+def _ema_panel(values, span):
+    """pandas ewm(span, adjust=False).mean() along axis 0, including its NaN handling."""
+    alpha = 2 / (span + 1)
+    valid = ~np.isnan(values)
+    started = np.maximum.accumulate(valid, axis=0)
+    if np.array_equal(valid, started):
+        # Only leading gaps: backfill them with the first close (an EMA of a
+        # constant is that constant) and run the plain recursion in place
+        first = valid.argmax(axis=0)
+        seeded = np.where(started, values, values[first, np.arange(values.shape[1])])
+        out = alpha * seeded
+        out[0] = seeded[0]
+        for t in range(1, len(out)):
+            out[t] += (1 - alpha) * out[t - 1]
+        out[~started] = np.nan
+        return out
+
+    out = np.empty(values.shape)
+    weighted = np.full(values.shape[1:], np.nan)
+    old_wt = np.ones(values.shape[1:])
+    for t in range(len(values)):
+        x = values[t]
+        is_valid = valid[t]
+        is_started = ~np.isnan(weighted)
+        old_wt = np.where(is_started, old_wt * (1 - alpha), old_wt)
+        update = is_valid & is_started
+        with np.errstate(invalid='ignore'):
+            blended = (old_wt * weighted + alpha * x) / (old_wt + alpha)
+        weighted = np.where(update, blended, weighted)
+        old_wt = np.where(update, 1.0, old_wt)
+        weighted = np.where(is_valid & ~is_started, x, weighted)
+        out[t] = weighted
+    return out
+
+
+def indicators_panel(closes, dtype=np.float64):
+    """Every indicator for a (time x symbol) array of closes in one vectorized pass.
+
+    Returns an array of shape (len(INDICATOR_COLUMNS), time, symbols) in
+    INDICATOR_COLUMNS order. Values match calculate_technical_indicators run
+    on each column separately; NaN marks missing bars (e.g. before a listing).
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    if closes.ndim == 1:
+        closes = closes[:, None]
+
+    # Shift each symbol by a constant so the cumulative sums stay small;
+    # means are shifted back, variances are unaffected
+    counts = (~np.isnan(closes)).sum(axis=0)
+    offset = np.nansum(closes, axis=0) / np.maximum(counts, 1)
+    centered = closes - offset
+
+    prefix = _PrefixSums(centered, squares=True)
+    ma20, std20 = prefix.mean_std(20, with_std=True)
+    ma20 += offset
+    ma50 = prefix.mean_std(50)[0] + offset
+    ma200 = prefix.mean_std(200)[0] + offset
+
+    delta = np.full(closes.shape, np.nan)
+    delta[1:] = closes[1:] - closes[:-1]
+    with np.errstate(invalid='ignore'):
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = _PrefixSums(gain).mean_std(14)[0]
+    avg_loss = _PrefixSums(loss).mean_std(14)[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+
+    macd = _ema_panel(closes, 12) - _ema_panel(closes, 26)
+    signal = _ema_panel(macd, 9)
+
+    out = np.empty((len(INDICATOR_COLUMNS),) + closes.shape, dtype=dtype)
+    for i, values in enumerate((ma20, ma50, ma200, rsi, macd, signal,
+                                ma20, ma20 + 2 * std20, ma20 - 2 * std20)):
+        out[i] = values
+    return out
+
+
+def indicators_panel_frame(closes, dtype=np.float64):
+    """indicators_panel for a DataFrame of closes (index: time, columns: symbols).
+
+    Returns a frame with (indicator, symbol) MultiIndex columns.
+    """
+    values = indicators_panel(closes.to_numpy(), dtype=dtype)
+    columns = pd.MultiIndex.from_product([INDICATOR_COLUMNS, closes.columns])
+    flat = values.transpose(1, 0, 2).reshape(len(closes), -1)
+    return pd.DataFrame(flat, index=closes.index, columns=columns)
+
+
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+def incremental_indicators(key, df):
+    """Indicators for `df` using the process-wide engine registered under `key`.
+
+    `key` identifies the series, e.g. (symbol, period, interval), so reruns
+    that append bars to the same series only pay for the new bars.
+    """
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = IndicatorEngine()
+        _engines.move_to_end(key)
+        while len(_engines) > config.INDICATOR_ENGINES_MAX:
+            _engines.popitem(last=False)
+    with engine.lock, timer('incremental_indicators', key[0]):
+        return engine.update(df)
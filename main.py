@@ -3,10 +3,19 @@
 import streamlit as st
 from auth import init_auth_db, login_form
 from stock_analysis import render_stock_analysis
+from watchlist import clear_watchlist_cache
+from prefetch import record_activity, start_prefetcher
+from metrics import start_exporters
 
 # Initialize the authentication database
 init_auth_db()
 
+# Keep hot market data warm in the background (once per server process)
+start_prefetcher()
+
+# Expose instrumentation metrics if an endpoint or file sink is configured
+start_exporters()
+
 # Page config
 st.set_page_config(
     page_title="Stock Market Analysis Platform",
@@ -20,9 +29,12 @@ with open('styles.css') as f:
 
 # Main application flow
 if login_form():
+    # Prefetch only runs while someone is using the dashboard
+    record_activity()
     render_stock_analysis()
 
     # Logout button in sidebar
     if st.sidebar.button("Logout"):
         st.session_state.authenticated = False
+        clear_watchlist_cache()
         st.rerun()
\ No newline at end of file
@@ -0,0 +1,256 @@
+"""In-process instrumentation for the hot data paths.
+
+`timed` (decorator) and `timer` (context manager) record a latency
+histogram, call count and error count per function and symbol; `cache_lookup`
+counts shared-cache hits and misses. Everything lives in one process-wide
+registry that can be exported as Prometheus text, either over HTTP
+(METRICS_PORT) or to a file for a textfile collector (METRICS_FILE).
+"""
+
+import functools
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+# Upper bounds in seconds, Prometheus style (+Inf is implied)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+OTHER_SYMBOL = 'other'
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'errors')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.errors = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.total += seconds
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-quantile (inf past the last bucket)."""
+        count = self.count
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float('inf')
+        return float('inf')
+
+
+class Registry:
+    """Thread-safe store of call histograms and cache counters."""
+
+    def __init__(self, max_symbols=config.METRICS_MAX_SYMBOLS):
+        self.max_symbols = max_symbols
+        self._lock = threading.Lock()
+        self._calls = {}   # (function, symbol) -> _Histogram
+        self._cache = {}   # (kind, symbol, result) -> count
+        self._symbols = set()
+
+    def _label(self, symbol):
+        # Bound label cardinality: symbols past the limit share one series
+        if not isinstance(symbol, str):
+            return ''
+        if symbol in self._symbols:
+            return symbol
+        if len(self._symbols) >= self.max_symbols:
+            return OTHER_SYMBOL
+        self._symbols.add(symbol)
+        return symbol
+
+    def observe(self, function, symbol, seconds, error=False):
+        with self._lock:
+            key = (function, self._label(symbol))
+            hist = self._calls.get(key)
+            if hist is None:
+                hist = self._calls[key] = _Histogram()
+            hist.observe(seconds)
+            if error:
+                hist.errors += 1
+
+    def cache_lookup(self, kind, symbol, hit):
+        with self._lock:
+            key = (kind, self._label(symbol), 'hit' if hit else 'miss')
+            self._cache[key] = self._cache.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._cache.clear()
+            self._symbols.clear()
+
+    def summary(self):
+        """Per-function totals (symbols merged), slowest total time first."""
+        with self._lock:
+            merged = {}
+            for (function, _), hist in self._calls.items():
+                into = merged.setdefault(function, _Histogram())
+                into.counts = [a + b for a, b in zip(into.counts, hist.counts)]
+                into.total += hist.total
+                into.errors += hist.errors
+            cache = {}
+            for (kind, _, result), n in self._cache.items():
+                counts = cache.setdefault(kind, {'hit': 0, 'miss': 0})
+                counts[result] += n
+        rows = []
+        for function, hist in merged.items():
+            count = hist.count
+            rows.append({
+                'function': function,
+                'calls': count,
+                'errors': hist.errors,
+                'total_s': round(hist.total, 3),
+                'mean_ms': round(1000 * hist.total / count, 2) if count else 0.0,
+                'p95_ms': 1000 * hist.quantile(0.95),
+            })
+        rows.sort(key=lambda row: row['total_s'], reverse=True)
+        return {'functions': rows, 'cache': cache}
+
+    def prometheus(self):
+        """Render the registry in the Prometheus text exposition format."""
+        with self._lock:
+            calls = {key: (list(h.counts), h.total, h.errors) for key, h in self._calls.items()}
+            cache = dict(self._cache)
+        lines = [
+            '# HELP stocksapp_call_duration_seconds Latency of instrumented calls.',
+            '# TYPE stocksapp_call_duration_seconds histogram',
+        ]
+        for (function, symbol), (counts, total, _) in sorted(calls.items()):
+            labels = f'function="{_escape(function)}",symbol="{_escape(symbol)}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float('inf'),), counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'stocksapp_call_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'stocksapp_call_duration_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'stocksapp_call_duration_seconds_count{{{labels}}} {cumulative}')
+        lines += [
+            '# HELP stocksapp_call_errors_total Instrumented calls that raised.',
+            '# TYPE stocksapp_call_errors_total counter',
+        ]
+        for (function, symbol), (_, _, errors) in sorted(calls.items()):
+            lines.append(f'stocksapp_call_errors_total{{function="{_escape(function)}",'
+                         f'symbol="{_escape(symbol)}"}} {errors}')
+        lines += [
+            '# HELP stocksapp_cache_requests_total Shared market data cache lookups.',
+            '# TYPE stocksapp_cache_requests_total counter',
+        ]
+        for (kind, symbol, result), n in sorted(cache.items()):
+            lines.append(f'stocksapp_cache_requests_total{{kind="{_escape(kind)}",'
+                         f'symbol="{_escape(symbol)}",result="{result}"}} {n}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+@contextmanager
+def timer(function, symbol=''):
+    """Time the block under `function`/`symbol`; an exception counts as an error and propagates."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        registry.observe(function, symbol, time.perf_counter() - start, error=True)
+        raise
+    registry.observe(function, symbol, time.perf_counter() - start)
+
+
+def timed(function, symbol_arg=0):
+    """Decorator form of `timer`; the symbol label is taken from positional arg `symbol_arg`."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            symbol = ''
+            if symbol_arg is not None and len(args) > symbol_arg:
+                symbol = args[symbol_arg]
+            with timer(function, symbol):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def cache_lookup(kind, symbol, hit):
+    registry.cache_lookup(kind, symbol, hit)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_metrics_file(path):
+    """Atomically replace `path` with the current metrics text."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(registry.prometheus())
+    os.replace(tmp, path)
+
+
+def _file_sink(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_metrics_file(path)
+        except OSError as e:
+            print(f"Error writing metrics to {path}: {str(e)}")
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_exporters():
+    """Start the HTTP endpoint and/or file sink configured in config, once per process."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    if config.METRICS_PORT:
+        try:
+            server = ThreadingHTTPServer((config.METRICS_HOST, config.METRICS_PORT), _MetricsHandler)
+        except OSError as e:
+            print(f"Metrics endpoint disabled: {str(e)}")
+        else:
+            threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    if config.METRICS_FILE:
+        threading.Thread(target=_file_sink, args=(config.METRICS_FILE, config.METRICS_FILE_INTERVAL),
+                         name='metrics-file', daemon=True).start()
@@ -0,0 +1,141 @@
+"""Local news index.
+
+Articles pulled from the market data provider are stored once in SQLite
+(config.NEWS_DB_PATH), deduplicated by link, and tagged with every symbol
+they were fetched for. An FTS5 table over title and summary serves
+keyword search. Views page through the index with indexed queries; the
+provider is only asked again once a symbol's last fetch is older than
+NEWS_REFRESH_INTERVAL.
+"""
+
+import re
+import time
+
+import config
+from db import ConnectionPool
+
+NEWS_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS articles
+       (id INTEGER PRIMARY KEY, link TEXT NOT NULL UNIQUE, title TEXT, publisher TEXT,
+        summary TEXT, published INTEGER)''',
+    '''CREATE TABLE IF NOT EXISTS news_symbols
+       (symbol TEXT, published INTEGER, article_id INTEGER,
+        PRIMARY KEY (symbol, published, article_id)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS news_fetches
+       (symbol TEXT PRIMARY KEY, fetched_at REAL)''',
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts
+       USING fts5(title, summary, content='articles', content_rowid='id')''',
+    '''CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+         INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+         INSERT INTO articles_fts (articles_fts, rowid, title, summary)
+         VALUES ('delete', old.id, old.title, old.summary);
+       END''',
+]
+
+INSERT_ARTICLE = '''INSERT OR IGNORE INTO articles (link, title, publisher, summary, published)
+                    VALUES (?, ?, ?, ?, ?)'''
+SELECT_ARTICLE_ID = 'SELECT id, published FROM articles WHERE link = ?'
+INSERT_NEWS_SYMBOL = 'INSERT OR IGNORE INTO news_symbols (symbol, published, article_id) VALUES (?, ?, ?)'
+UPSERT_FETCH = '''INSERT INTO news_fetches (symbol, fetched_at) VALUES (?, ?)
+                  ON CONFLICT(symbol) DO UPDATE SET fetched_at = excluded.fetched_at'''
+SELECT_FETCHED_AT = 'SELECT fetched_at FROM news_fetches WHERE symbol = ?'
+
+# Formatted in SQL so only the rows on the page are converted
+ARTICLE_FIELDS = '''a.title, a.publisher, a.link, a.summary,
+                    strftime('%Y-%m-%d %H:%M', a.published, 'unixepoch', 'localtime')'''
+SELECT_PAGE = f'''SELECT {ARTICLE_FIELDS}
+                  FROM news_symbols s JOIN articles a ON a.id = s.article_id
+                  WHERE s.symbol = ?
+                  ORDER BY s.published DESC LIMIT ? OFFSET ?'''
+COUNT_PAGE = 'SELECT COUNT(*) FROM news_symbols WHERE symbol = ?'
+SEARCH_PAGE = f'''SELECT {ARTICLE_FIELDS}
+                  FROM news_symbols s JOIN articles a ON a.id = s.article_id
+                  JOIN articles_fts f ON f.rowid = s.article_id
+                  WHERE s.symbol = ? AND articles_fts MATCH ?
+                  ORDER BY s.published DESC LIMIT ? OFFSET ?'''
+COUNT_SEARCH = '''SELECT COUNT(*) FROM news_symbols s JOIN articles_fts f ON f.rowid = s.article_id
+                  WHERE s.symbol = ? AND articles_fts MATCH ?'''
+PRUNE_SYMBOLS = 'DELETE FROM news_symbols WHERE published < ?'
+PRUNE_ARTICLES = 'DELETE FROM articles WHERE published < ?'
+
+
+def match_expression(text):
+    """FTS5 query matching every word of `text` as a prefix; user syntax is never passed through."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+def _row(article, fetched_at):
+    link = article.get('link') or ''
+    title = article.get('title') or ''
+    publisher = article.get('publisher') or ''
+    # Articles without a link are deduplicated on their source and headline; without a
+    # publish time they are dated when first fetched, so pruning doesn't drop them at once
+    return (link or f'{publisher}:{title}', title, publisher, article.get('summary') or '',
+            int(article.get('providerPublishTime') or fetched_at))
+
+
+def _format(row):
+    title, publisher, link, summary, published = row
+    return {'title': title, 'publisher': publisher, 'link': link, 'published': published, 'summary': summary}
+
+
+class NewsIndex:
+    def __init__(self, path, refresh_interval=config.NEWS_REFRESH_INTERVAL):
+        self.pool = ConnectionPool(path, schema=NEWS_SCHEMA)
+        self.refresh_interval = refresh_interval
+
+    def ingest(self, symbol, articles):
+        """Store `articles` (normalized provider news) for `symbol`; returns how many were new."""
+        now = time.time()
+        rows = [_row(article, now) for article in articles if article.get('title')]
+        with self.pool.transaction() as conn:
+            added = conn.executemany(INSERT_ARTICLE, rows).rowcount
+            tags = []
+            for row in rows:
+                article_id, published = conn.execute(SELECT_ARTICLE_ID, (row[0],)).fetchone()
+                tags.append((symbol, published, article_id))
+            conn.executemany(INSERT_NEWS_SYMBOL, tags)
+            conn.execute(UPSERT_FETCH, (symbol, now))
+        return added
+
+    def is_stale(self, symbol):
+        row = self.pool.fetch_one(SELECT_FETCHED_AT, (symbol,))
+        return row is None or time.time() - row[0] > self.refresh_interval
+
+    def sync(self, symbol, fetch):
+        """Ingest fetch() for `symbol` if its last fetch is too old.
+
+        On upstream errors the articles already indexed keep being served.
+        """
+        if not self.is_stale(symbol):
+            return
+        try:
+            self.ingest(symbol, fetch())
+        except Exception as e:
+            print(f"Error fetching news for {symbol}: {str(e)}")
+
+    def page(self, symbol, query='', page=0, page_size=config.NEWS_PAGE_SIZE):
+        """One page of `symbol`'s articles matching `query` (all if empty), newest first."""
+        expression = match_expression(query)
+        if expression:
+            rows = self.pool.fetch_all(SEARCH_PAGE, (symbol, expression, page_size, page * page_size))
+        else:
+            rows = self.pool.fetch_all(SELECT_PAGE, (symbol, page_size, page * page_size))
+        return [_format(row) for row in rows]
+
+    def count(self, symbol, query=''):
+        expression = match_expression(query)
+        if expression:
+            return self.pool.fetch_one(COUNT_SEARCH, (symbol, expression))[0]
+        return self.pool.fetch_one(COUNT_PAGE, (symbol,))[0]
+
+    def prune(self, retention_days=config.NEWS_RETENTION_DAYS):
+        cutoff = int(time.time() - retention_days * 86400)
+        with self.pool.transaction() as conn:
+            conn.execute(PRUNE_SYMBOLS, (cutoff,))
+            conn.execute(PRUNE_ARTICLES, (cutoff,))
+
+
+news_index = NewsIndex(config.NEWS_DB_PATH)
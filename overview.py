@@ -0,0 +1,167 @@
+"""Process-wide Market Overview snapshot.
+
+The overview is the same for every user, so it is built once per
+OVERVIEW_REFRESH_INTERVAL instead of once per session. A snapshot holds
+the trending quotes (raw and as the card table), the index charts as
+plotly JSON from the shared figure cache, and a version stamp. Sessions
+share the current snapshot and never modify it; each decodes its own
+chart figures. A refresh builds a new one and swaps it in, and the
+previous one keeps being served until then. The latest snapshot is
+also written to disk, so a restarted server has an overview to show
+before its first rebuild, unless the file is older than
+OVERVIEW_SNAPSHOT_MAX_AGE.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import wait
+
+import config
+from charts import cached_figure_json, line_figure
+from utils import fetch_many, get_stock_history, get_trending_infos, trending_frame
+
+Snapshot = namedtuple('Snapshot', ['version', 'built_at', 'infos', 'trending', 'figures'])
+
+
+class OverviewSnapshots:
+    def __init__(self, path, refresh_interval=config.OVERVIEW_REFRESH_INTERVAL,
+                 max_age=config.OVERVIEW_SNAPSHOT_MAX_AGE):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._snapshot = None
+        self._loaded = False
+        self._refresh_lock = threading.Lock()
+        self._pending = False
+        self._pending_lock = threading.Lock()
+
+    def _latest(self):
+        if not self._loaded:
+            self._snapshot = self._load()
+            self._loaded = True
+        return self._snapshot
+
+    def current(self):
+        """The latest snapshot, or None if none was ever built.
+
+        An outdated snapshot is still returned; a rebuild then starts in a
+        background thread, so no session waits on upstream for it.
+        """
+        snapshot = self._latest()
+        if snapshot is not None and time.time() - snapshot.built_at >= self.refresh_interval:
+            self._refresh_in_background()
+        return snapshot
+
+    def refresh_after(self, futures):
+        """Build a snapshot in the background once `futures` are done.
+
+        For a caller that is already fetching the overview's data: the
+        build then reads those results from the cache instead of asking
+        upstream a second time.
+        """
+        self._refresh_in_background(futures)
+
+    def _refresh_in_background(self, futures=()):
+        # At most one background rebuild, waiting or running, at a time
+        with self._pending_lock:
+            if self._pending:
+                return
+            self._pending = True
+
+        def run():
+            try:
+                wait(futures)
+                self.refresh()
+            except Exception as e:
+                print(f"Error building market overview: {str(e)}")
+            finally:
+                with self._pending_lock:
+                    self._pending = False
+
+        threading.Thread(target=run, name='overview-snapshot', daemon=True).start()
+
+    def clear(self):
+        """Forget the in-memory snapshot once any rebuild in progress ends; the file on disk is left alone."""
+        with self._refresh_lock:
+            self._snapshot = None
+            self._loaded = True
+
+    def refresh(self, max_age=None):
+        """Rebuild the snapshot unless it is younger than `max_age` seconds.
+
+        Returns False only when a rebuild ran and got no quotes at all. A
+        rebuild already running in another thread makes this a no-op.
+        """
+        previous = self._latest()
+        max_age = self.refresh_interval if max_age is None else max_age
+        if previous is not None and time.time() - previous.built_at < max_age:
+            return True
+        if not self._refresh_lock.acquire(blocking=False):
+            return True
+        try:
+            return self._build(previous) is not None
+        finally:
+            self._refresh_lock.release()
+
+    def _build(self, previous):
+        fetched = get_trending_infos()
+        if not fetched:
+            print("Error building market overview: no trending quotes")
+            return None
+        # Symbols that failed this time keep their last known quote
+        known = dict(previous.infos) if previous is not None else {}
+        known.update(fetched)
+        infos = {symbol: known[symbol] for symbol in config.TRENDING_SYMBOLS if symbol in known}
+
+        histories = fetch_many(list(config.MARKET_INDICES), lambda idx: get_stock_history(idx, '1mo'))
+        figures = dict(previous.figures) if previous is not None else {}
+        for idx, name in config.MARKET_INDICES.items():
+            df = histories.get(idx)
+            if df is not None and len(df):
+                # Same cache entry the live render uses, so the chart is built once
+                figures[idx] = cached_figure_json(idx, 'index', df, lambda: line_figure(df, ['Close'], name), '1mo')
+
+        built_at = time.time()
+        snapshot = Snapshot(int(built_at * 1000), built_at, infos, trending_frame(infos), figures)
+        self._snapshot = snapshot
+        try:
+            self._save(snapshot)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error saving market overview snapshot: {str(e)}")
+        return snapshot
+
+    def _save(self, snapshot):
+        data = {
+            'version': snapshot.version,
+            'built_at': snapshot.built_at,
+            'infos': snapshot.infos,
+            'figures': snapshot.figures,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if time.time() - data['built_at'] > self.max_age:
+                print("Market overview snapshot on disk is too old; rebuilding it")
+                return None
+            return Snapshot(data['version'], data['built_at'], data['infos'],
+                            trending_frame(data['infos']), data['figures'])
+        except Exception as e:
+            print(f"Error reading market overview snapshot: {str(e)}")
+            return None
+
+
+overview_snapshots = OverviewSnapshots(config.OVERVIEW_SNAPSHOT_PATH)
@@ -0,0 +1,132 @@
+"""Background warm-up of hot market data.
+
+One daemon thread per server process keeps the datasets every user opens
+fresh: the Market Overview snapshot (trending quotes and the major index
+histories) and the quotes for each saved watchlist in the shared cache.
+Sessions then read them from memory. It also keeps the screener index
+and the local news index up to date.
+Each job runs on its own jittered schedule and backs off exponentially
+while upstream keeps failing. The thread only works while sessions are
+active: once none has rendered for PREFETCH_IDLE_AFTER seconds it sleeps
+until the next one does.
+"""
+
+import random
+import threading
+import time
+
+import config
+from cache import refreshing
+from db import pool
+from news import news_index
+from overview import overview_snapshots
+from providers import get_provider
+from screener import screener_index
+from utils import fetch_many, get_batch_quotes
+
+SELECT_WATCHLISTS = 'SELECT email, symbol FROM watchlist ORDER BY email'
+
+_started = False
+_start_lock = threading.Lock()
+_stop = threading.Event()
+_wake = threading.Event()
+_last_activity = 0.0
+
+
+def _refresh_overview():
+    # Rebuilt on every run; its quotes and histories land in the cache too
+    return overview_snapshots.refresh(max_age=0)
+
+
+def _refresh_watchlists():
+    watchlists = {}
+    for email, symbol in pool.fetch_all(SELECT_WATCHLISTS):
+        watchlists.setdefault(email, []).append(symbol)
+    # Sessions key batch quotes by their symbol set, so warm each distinct set once
+    symbol_sets = {tuple(sorted(symbols)) for symbols in watchlists.values()}
+    return all([bool(get_batch_quotes(list(symbols))) for symbols in symbol_sets])
+
+
+def _refresh_news():
+    watched = [symbol for _, symbol in pool.fetch_all(SELECT_WATCHLISTS)]
+    symbols = list(dict.fromkeys(config.TRENDING_SYMBOLS + watched))
+    stale = [symbol for symbol in symbols if news_index.is_stale(symbol)]
+    fetched = fetch_many(stale, lambda symbol: get_provider().news(symbol))
+    for symbol, articles in fetched.items():
+        news_index.ingest(symbol, articles)
+    news_index.prune()
+    return len(fetched) == len(stale)
+
+
+JOBS = [
+    ('overview', _refresh_overview),
+    ('watchlists', _refresh_watchlists),
+    # Returns straight away until the index is SCREENER_REFRESH_INTERVAL old
+    ('screener', screener_index.refresh),
+    ('news', _refresh_news),
+]
+
+
+def _next_delay(failures):
+    delay = config.PREFETCH_INTERVAL * (2 ** failures)
+    delay = min(delay, config.PREFETCH_MAX_BACKOFF)
+    return delay * random.uniform(1 - config.PREFETCH_JITTER, 1 + config.PREFETCH_JITTER)
+
+
+def record_activity():
+    """Note that a signed-in session rendered; wakes an idle prefetcher."""
+    global _last_activity
+    _last_activity = time.monotonic()
+    _wake.set()
+
+
+def _idle():
+    return time.monotonic() - _last_activity > config.PREFETCH_IDLE_AFTER
+
+
+def _run():
+    failures = {name: 0 for name, _ in JOBS}
+    # Stagger the first runs so jobs don't all hit upstream at once
+    next_run = {name: time.monotonic() + random.uniform(0, config.PREFETCH_JITTER * config.PREFETCH_INTERVAL)
+                for name, _ in JOBS}
+    while not _stop.is_set():
+        if _idle():
+            _wake.clear()
+            # Checked again after clearing, so activity recorded in between isn't missed
+            if _idle():
+                _wake.wait()
+            continue
+        now = time.monotonic()
+        for name, job in JOBS:
+            if next_run[name] > now:
+                continue
+            try:
+                with refreshing():
+                    ok = job()
+            except Exception as e:
+                print(f"Prefetch job {name} failed: {str(e)}")
+                ok = False
+            failures[name] = 0 if ok else failures[name] + 1
+            next_run[name] = time.monotonic() + _next_delay(failures[name])
+        _stop.wait(max(0.1, min(next_run.values()) - time.monotonic()))
+
+
+def start_prefetcher():
+    """Start the warm-up thread once per process, if enabled in config."""
+    global _started
+    if not config.PREFETCH_ENABLED:
+        return
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        _stop.clear()
+    threading.Thread(target=_run, name='prefetch', daemon=True).start()
+
+
+def stop_prefetcher():
+    global _started
+    _stop.set()
+    _wake.set()
+    with _start_lock:
+        _started = False
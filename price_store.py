@@ -0,0 +1,232 @@
+"""Local columnar OHLCV store with incremental appends.
+
+Bars for one (symbol, interval) live in a directory of Parquet parts
+described by a small JSON manifest. A sync only asks upstream for the
+bars from the last completed stored bar onwards and writes them as a new
+part, so nothing already stored is read back or rewritten. A read prunes
+parts by their time range, filters rows, and lets the newest copy of a
+re-fetched bar win.
+
+Upstream prices are split- and dividend-adjusted. If the re-fetched
+completed bar no longer matches the stored close, the stored history is
+on a different adjustment basis, so the period is fetched again in full
+and the directory rewritten. Parts are compacted into one once there are
+more than PRICE_STORE_MAX_PARTS, and intraday bars are only kept for
+PRICE_STORE_INTRADAY_DAYS.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import config
+from providers import HISTORY_COLUMNS as COLUMNS, PERIOD_OFFSETS, SESSION_PERIODS, get_provider
+
+# Periods in increasing length; '1d'/'5d' count trading sessions, the rest are calendar spans
+PERIODS = ['1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'max']
+MANIFEST = 'manifest.json'
+
+
+def _provider_fetch(symbol, interval, period=None, start=None):
+    return get_provider().history(symbol, period=period, interval=interval, start=start)
+
+
+def _is_intraday(interval):
+    return interval.endswith('m') or interval.endswith('h')
+
+
+class PriceStore:
+    def __init__(self, root, fetch=_provider_fetch, min_refresh=config.PRICE_STORE_MIN_REFRESH,
+                 max_parts=config.PRICE_STORE_MAX_PARTS, intraday_days=config.PRICE_STORE_INTRADAY_DAYS):
+        self.root = root
+        self.fetch = fetch
+        self.min_refresh = min_refresh
+        self.max_parts = max_parts
+        self.intraday_days = intraday_days
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _dir(self, symbol, interval):
+        safe = symbol.replace('/', '_').replace('^', 'IDX_')
+        return os.path.join(self.root, interval, safe)
+
+    def _lock(self, directory):
+        with self._locks_guard:
+            return self._locks.setdefault(directory, threading.Lock())
+
+    def _read_manifest(self, directory):
+        path = os.path.join(directory, MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, directory, manifest):
+        path = os.path.join(directory, MANIFEST)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def _write_part(self, directory, manifest, df):
+        os.makedirs(directory, exist_ok=True)
+        name = f"{manifest['next_part']:08d}.parquet"
+        manifest['next_part'] += 1
+        table = pa.Table.from_pandas(df.rename_axis('ts').reset_index(), preserve_index=False)
+        path = os.path.join(directory, name)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        manifest['parts'].append({'file': name, 'first': df.index[0].isoformat(), 'last': df.index[-1].isoformat()})
+
+    def _timestamp(self, manifest, text):
+        # Manifest times are ISO strings; compare them in the stored column's unit and zone
+        ts = pd.Timestamp(text).as_unit('ns')
+        return ts.tz_convert(manifest['tz']) if manifest['tz'] is not None else ts
+
+    def _read(self, directory, manifest, start=None, columns=COLUMNS):
+        parts = [part for part in manifest['parts']
+                 if start is None or self._timestamp(manifest, part['last']) >= start]
+        filters = [('ts', '>=', start)] if start is not None else None
+        frames = [pq.read_table(os.path.join(directory, part['file']), columns=['ts'] + columns,
+                                filters=filters, memory_map=True).to_pandas()
+                  for part in parts]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        df = pd.concat(frames, ignore_index=True).set_index('ts')
+        # Parts are in write order, so the last copy of a bar is the newest
+        return df[~df.index.duplicated(keep='last')].sort_index()
+
+    def _fetch_bars(self, symbol, interval, period=None, start=None):
+        df = self.fetch(symbol, interval, period=period, start=start)
+        if df is None or len(df) == 0:
+            return None
+        # Upstream occasionally repeats a timestamp; keep its last copy
+        df = df[COLUMNS]
+        return df[~df.index.duplicated(keep='last')].sort_index()
+
+    def _retention_start(self, interval, last):
+        if not _is_intraday(interval):
+            return None
+        return last - pd.Timedelta(days=self.intraday_days)
+
+    def _rewrite(self, directory, interval, manifest, df, covered, now):
+        """Replace everything stored with `df` as a single part."""
+        cutoff = self._retention_start(interval, df.index[-1])
+        if cutoff is not None:
+            df = df[df.index >= cutoff]
+        old_parts = manifest['parts'] if manifest is not None else []
+        legacy = f'{directory}.parquet'
+        if manifest is None and os.path.exists(legacy):
+            # Single-file layout from before parts; it is simply fetched again
+            os.remove(legacy)
+        new = {
+            'covered': covered,
+            'fetched_at': now,
+            'tz': str(df.index.tz) if df.index.tz is not None else None,
+            'next_part': manifest['next_part'] if manifest is not None else 0,
+            'parts': [],
+            'tail': [],
+        }
+        self._write_part(directory, new, df)
+        new['tail'] = [[ts.isoformat(), float(close)] for ts, close in df['Close'].iloc[-2:].items()]
+        self._write_manifest(directory, new)
+        for part in old_parts:
+            try:
+                os.remove(os.path.join(directory, part['file']))
+            except OSError:
+                pass
+
+    def _append(self, directory, interval, manifest, rows, now):
+        if len(rows):
+            self._write_part(directory, manifest, rows)
+            kept = [bar for bar in manifest['tail'] if self._timestamp(manifest, bar[0]) < rows.index[0]]
+            fresh = [[ts.isoformat(), float(close)] for ts, close in rows['Close'].iloc[-2:].items()]
+            manifest['tail'] = (kept + fresh)[-2:]
+        manifest['fetched_at'] = now
+
+        cutoff = self._retention_start(interval, self._timestamp(manifest, manifest['tail'][-1][0]))
+        if cutoff is not None:
+            expired = [part for part in manifest['parts'] if self._timestamp(manifest, part['last']) < cutoff]
+            manifest['parts'] = [part for part in manifest['parts'] if part not in expired]
+        else:
+            expired = []
+        if len(manifest['parts']) > self.max_parts:
+            self._rewrite(directory, interval, manifest, self._read(directory, manifest),
+                          manifest['covered'], now)
+        else:
+            self._write_manifest(directory, manifest)
+        for part in expired:
+            os.remove(os.path.join(directory, part['file']))
+
+    def _sync(self, symbol, period, interval, directory):
+        manifest = self._read_manifest(directory)
+        now = time.time()
+        covered = manifest is not None and PERIODS.index(manifest['covered']) >= PERIODS.index(period)
+        if covered and now - manifest['fetched_at'] < self.min_refresh:
+            return
+
+        if covered and manifest['tail']:
+            # Re-fetch from the last completed bar: the newest one may still be forming
+            anchor, anchor_close = manifest['tail'][0]
+            anchor = self._timestamp(manifest, anchor)
+            try:
+                fresh = self._fetch_bars(symbol, interval, start=anchor)
+            except Exception as e:
+                print(f"Incremental fetch failed for {symbol} ({interval}): {str(e)}")
+                fresh, covered = None, False
+            if covered:
+                if fresh is None:
+                    self._append(directory, interval, manifest, pd.DataFrame(columns=COLUMNS), now)
+                    return
+                if manifest['tz'] is not None and fresh.index.tz is not None:
+                    fresh = fresh.tz_convert(manifest['tz'])
+                complete = len(manifest['tail']) > 1
+                if complete and anchor in fresh.index and not math.isclose(
+                        fresh.at[anchor, 'Close'], anchor_close, rel_tol=1e-6):
+                    print(f"{symbol} ({interval}) history was re-adjusted upstream; fetching it again")
+                    covered = False
+                else:
+                    self._append(directory, interval, manifest, fresh[fresh.index > anchor] if complete else fresh, now)
+                    return
+
+        fetch_period = period if manifest is None else max(manifest['covered'], period, key=PERIODS.index)
+        fresh = self._fetch_bars(symbol, interval, period=fetch_period)
+        if fresh is None:
+            return
+        self._rewrite(directory, interval, manifest, fresh, fetch_period, now)
+
+    def _window_start(self, directory, manifest, period):
+        if not manifest['tail']:
+            return None
+        if period in SESSION_PERIODS:
+            ts = self._read(directory, manifest, columns=[]).index.to_series()
+            sessions = ts.dt.normalize().unique()
+            if len(sessions) == 0:
+                return None
+            return sessions[-min(SESSION_PERIODS[period], len(sessions))]
+        if period in PERIOD_OFFSETS:
+            # Measured back from the newest stored bar, which a sync has just brought up to date
+            return self._timestamp(manifest, manifest['tail'][-1][0]) - PERIOD_OFFSETS[period]
+        return None
+
+    def load(self, symbol, period='1y', interval='1d'):
+        """Return OHLCV bars for the period, fetching only what the store lacks."""
+        directory = self._dir(symbol, interval)
+        with self._lock(directory):
+            self._sync(symbol, period, interval, directory)
+            manifest = self._read_manifest(directory)
+            if manifest is None:
+                return pd.DataFrame(columns=COLUMNS)
+            df = self._read(directory, manifest, self._window_start(directory, manifest, period))
+        df.index.name = 'Date' if interval in ('1d', '5d', '1wk', '1mo', '3mo') else 'Datetime'
+        return df
+
+
+price_store = PriceStore(config.PRICE_STORE_DIR)
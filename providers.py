@@ -0,0 +1,304 @@
+"""Pluggable market data providers.
+
+Everything the app reads from upstream (price history, info snapshots,
+news and batch quotes) goes through the active MarketDataProvider. Two
+backends exist:
+
+- YFinanceProvider: live data from Yahoo Finance.
+- ReplayProvider: deterministic data from recorded fixtures on disk, with
+  configurable latency and error injection. It makes the dashboard
+  runnable and benchmarkable offline.
+
+The backend is chosen in config (MARKET_DATA_PROVIDER) or replaced at
+runtime with set_provider().
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+
+import pandas as pd
+import yfinance as yf
+
+import config
+
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+PERIOD_OFFSETS = {
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+SESSION_PERIODS = {'1d': 1, '5d': 5}
+
+
+def quotes_from_closes(closes_by_symbol):
+    """{symbol: {'Price', 'Change'}} from each symbol's recent daily closes."""
+    quotes = {}
+    for symbol, closes in closes_by_symbol.items():
+        closes = closes.dropna()
+        if len(closes) == 0:
+            continue
+        last = float(closes.iloc[-1])
+        previous = float(closes.iloc[-2]) if len(closes) > 1 else last
+        quotes[symbol] = {
+            'Price': last,
+            'Change': (last / previous - 1) * 100 if previous else 0.0
+        }
+    return quotes
+
+
+def normalize_article(article):
+    """Flatten a news item to title/publisher/link/providerPublishTime/summary.
+
+    Newer yfinance releases nest the fields under 'content'; older ones
+    return them flat.
+    """
+    content = article.get('content')
+    if not isinstance(content, dict):
+        return article
+    published = content.get('pubDate') or content.get('displayTime')
+    return {
+        'title': content.get('title', ''),
+        'publisher': (content.get('provider') or {}).get('displayName', ''),
+        'link': ((content.get('canonicalUrl') or content.get('clickThroughUrl')) or {}).get('url', ''),
+        'providerPublishTime': int(pd.Timestamp(published).timestamp()) if published else 0,
+        'summary': content.get('summary', ''),
+    }
+
+
+class MarketDataProvider(ABC):
+    name = 'base'
+
+    def __init__(self):
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+
+    def _count(self, kind):
+        # Providers are called from the fetch pool's threads
+        with self._calls_lock:
+            self.calls[kind] += 1
+
+    def total_calls(self):
+        with self._calls_lock:
+            return sum(self.calls.values())
+
+    @abstractmethod
+    def history(self, symbol, period=None, interval='1d', start=None):
+        """OHLCV bars for a period, or from `start` onwards."""
+
+    @abstractmethod
+    def info(self, symbol):
+        """Info snapshot dict (quote fields and company profile)."""
+
+    @abstractmethod
+    def news(self, symbol):
+        """Recent articles, each normalized with normalize_article."""
+
+    @abstractmethod
+    def quotes(self, symbols):
+        """{symbol: {'Price', 'Change'}} for many symbols in one request."""
+
+    @abstractmethod
+    def closes(self, symbols, period, interval='1d'):
+        """Close prices for many symbols in one request, as a time x symbol frame."""
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = 'yfinance'
+
+    def history(self, symbol, period=None, interval='1d', start=None):
+        self._count('history')
+        stock = yf.Ticker(symbol)
+        if start is not None:
+            return stock.history(start=start, interval=interval)
+        return stock.history(period=period, interval=interval)
+
+    def info(self, symbol):
+        self._count('info')
+        return yf.Ticker(symbol).info
+
+    def news(self, symbol):
+        self._count('news')
+        return [normalize_article(article) for article in yf.Ticker(symbol).news]
+
+    def quotes(self, symbols):
+        self._count('quotes')
+        # One multi-ticker request; a few daily bars give the last and previous close
+        data = yf.download(symbols, period='5d', interval='1d', group_by='ticker',
+                           auto_adjust=True, progress=False, threads=True)
+        closes = {}
+        for symbol in symbols:
+            try:
+                closes[symbol] = data[symbol]['Close']
+            except KeyError:
+                continue
+        return quotes_from_closes(closes)
+
+    def closes(self, symbols, period, interval='1d'):
+        self._count('closes')
+        data = yf.download(symbols, period=period, interval=interval, group_by='ticker',
+                           auto_adjust=True, progress=False, threads=True)
+        columns = {}
+        for symbol in symbols:
+            try:
+                columns[symbol] = data[symbol]['Close']
+            except KeyError:
+                continue
+        return pd.DataFrame(columns)
+
+
+class ReplayError(ConnectionError):
+    pass
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serves recorded fixtures from `root`:
+
+        history/<interval>/<symbol>.parquet
+        info/<symbol>.json
+        news/<symbol>.json
+
+    `latency` (seconds, or a callable taking the call kind) is slept before
+    every call, and a seeded `error_rate` fraction of calls raise ReplayError.
+    Periods are measured back from the last recorded bar, so results do not
+    depend on the wall clock.
+    """
+
+    name = 'replay'
+
+    def __init__(self, root, latency=0.0, error_rate=0.0, seed=0):
+        super().__init__()
+        self.root = root
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self, kind, symbol):
+        self._count(kind)
+        delay = self.latency(kind) if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+        if failed:
+            raise ReplayError(f"injected {kind} failure for {symbol}")
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def _file_symbol(self, symbol):
+        return symbol.replace('/', '_').replace('^', 'IDX_')
+
+    def _read_history(self, symbol, interval):
+        path = self._path('history', interval, f'{self._file_symbol(symbol)}.parquet')
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+        return pd.read_parquet(path)
+
+    def _window(self, df, period=None, start=None):
+        if len(df) == 0:
+            return df
+        if start is not None:
+            return df[df.index >= pd.Timestamp(start)]
+        if period in SESSION_PERIODS:
+            sessions = df.index.normalize().unique()
+            return df[df.index >= sessions[-min(SESSION_PERIODS[period], len(sessions))]]
+        if period in PERIOD_OFFSETS:
+            return df[df.index >= df.index[-1] - PERIOD_OFFSETS[period]]
+        return df
+
+    def history(self, symbol, period=None, interval='1d', start=None):
+        self._call('history', symbol)
+        return self._window(self._read_history(symbol, interval), period, start)
+
+    def _read_json(self, kind, symbol, default):
+        path = self._path(kind, f'{self._file_symbol(symbol)}.json')
+        if not os.path.exists(path):
+            return default
+        with open(path) as f:
+            return json.load(f)
+
+    def info(self, symbol):
+        self._call('info', symbol)
+        return self._read_json('info', symbol, {})
+
+    def news(self, symbol):
+        self._call('news', symbol)
+        return [normalize_article(article) for article in self._read_json('news', symbol, [])]
+
+    def quotes(self, symbols):
+        self._call('quotes', ','.join(symbols))
+        return quotes_from_closes({symbol: self._read_history(symbol, '1d')['Close'].iloc[-5:]
+                                   for symbol in symbols})
+
+    def closes(self, symbols, period, interval='1d'):
+        self._call('closes', ','.join(symbols))
+        columns = {}
+        for symbol in symbols:
+            df = self._window(self._read_history(symbol, interval), period)
+            if len(df):
+                columns[symbol] = df['Close']
+        return pd.DataFrame(columns)
+
+
+def write_fixtures(root, symbol, history=None, info=None, news=None):
+    """Store one symbol's fixtures in ReplayProvider's layout.
+
+    `history` maps interval -> OHLCV frame.
+    """
+    file_symbol = symbol.replace('/', '_').replace('^', 'IDX_')
+    for interval, df in (history or {}).items():
+        os.makedirs(os.path.join(root, 'history', interval), exist_ok=True)
+        df[HISTORY_COLUMNS].to_parquet(os.path.join(root, 'history', interval, f'{file_symbol}.parquet'))
+    for kind, payload in (('info', info), ('news', news)):
+        if payload is not None:
+            os.makedirs(os.path.join(root, kind), exist_ok=True)
+            with open(os.path.join(root, kind, f'{file_symbol}.json'), 'w') as f:
+                json.dump(payload, f, default=str)
+
+
+def record_fixtures(root, symbols, intervals=(('5y', '1d'), ('5d', '1m')), source=None):
+    """Record live data for `symbols` into `root` for later replay."""
+    source = source or YFinanceProvider()
+    for symbol in symbols:
+        history = {interval: source.history(symbol, period=period, interval=interval)
+                   for period, interval in intervals}
+        write_fixtures(root, symbol, history=history, info=source.info(symbol), news=source.news(symbol))
+
+
+def _provider_from_config():
+    if config.MARKET_DATA_PROVIDER == 'replay':
+        return ReplayProvider(config.REPLAY_DIR, latency=config.REPLAY_LATENCY,
+                              error_rate=config.REPLAY_ERROR_RATE, seed=config.REPLAY_SEED)
+    return YFinanceProvider()
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = _provider_from_config()
+    return _provider
+
+
+def set_provider(provider):
+    """Swap the active provider, e.g. for benchmarks; returns the previous one."""
+    global _provider
+    with _provider_lock:
+        previous, _provider = _provider, provider
+    return previous
@@ -0,0 +1,349 @@
+"""Market screener over a configurable symbol universe.
+
+The universe is read from a CSV (config.SCREENER_UNIVERSE, columns Symbol,
+Name, Sector). The screener index holds one row per symbol with its latest
+indicator values and fundamentals. A refresh recomputes indicators only for
+symbols whose newest daily bar or its close changed, and re-reads fundamentals once they
+are older than SCREENER_INFO_MAX_AGE. The index is saved next to the price
+store, so a restarted server can answer queries straight away.
+
+Queries such as "RSI < 30 and price > MA200" are tokenized and parsed here
+(nothing is passed to eval) and run as vectorized masks over the index.
+"""
+
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+from cache import cached
+from compare import align
+from indicators import INDICATOR_COLUMNS, indicators_panel
+from price_store import price_store
+from providers import get_provider
+from utils import fetch_many
+
+INDEX_COLUMNS = ['Name', 'Sector', 'Price', 'Change', 'RSI', 'MA20', 'MA50', 'MA200', 'MACD', 'Signal',
+                 'BB_Upper', 'BB_Lower', 'BB_Position', 'Golden_Cross', 'MACD_Bullish', 'PE', 'MarketCap',
+                 'LastBar', 'InfoAt']
+
+# Query names (lower case) -> index columns
+FIELDS = {
+    'symbol': 'Symbol', 'name': 'Name', 'sector': 'Sector',
+    'price': 'Price', 'close': 'Price', 'change': 'Change',
+    'rsi': 'RSI', 'ma20': 'MA20', 'ma50': 'MA50', 'ma200': 'MA200',
+    'macd': 'MACD', 'signal': 'Signal',
+    'bb_upper': 'BB_Upper', 'bb_lower': 'BB_Lower', 'bb_position': 'BB_Position', 'bb_pos': 'BB_Position',
+    'golden_cross': 'Golden_Cross', 'macd_bullish': 'MACD_Bullish',
+    'pe': 'PE', 'market_cap': 'MarketCap', 'marketcap': 'MarketCap', 'mcap': 'MarketCap',
+}
+TEXT_COLUMNS = {'Symbol', 'Name', 'Sector'}
+BOOL_COLUMNS = {'Golden_Cross', 'MACD_Bullish'}
+SORTABLE = ['MarketCap', 'Price', 'Change', 'RSI', 'PE', 'BB_Position', 'MACD', 'Symbol']
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<number>-?\d+(?:\.\d+)?[kmbt]?%?(?![A-Za-z0-9_])) |
+    (?P<string>"[^"]*"|'[^']*') |
+    (?P<op><=|>=|==|!=|<|>|=) |
+    (?P<paren>[()]) |
+    (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+)""", re.VERBOSE | re.IGNORECASE)
+_SUFFIXES = {'k': 1e3, 'm': 1e6, 'b': 1e9, 't': 1e12}
+_COMPARE = {
+    '<': lambda a, b: a < b, '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b, '>=': lambda a, b: a >= b,
+    '=': lambda a, b: a == b, '==': lambda a, b: a == b, '!=': lambda a, b: a != b,
+}
+
+
+def load_universe(path=config.SCREENER_UNIVERSE):
+    """Universe frame indexed by upper-case symbol, with Name and Sector columns."""
+    universe = pd.read_csv(path, dtype=str).fillna('')
+    universe['Symbol'] = universe['Symbol'].str.strip().str.upper()
+    universe = universe[universe['Symbol'] != ''].drop_duplicates('Symbol')
+    for column in ('Name', 'Sector'):
+        if column not in universe:
+            universe[column] = ''
+    return universe.set_index('Symbol')[['Name', 'Sector']]
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"unexpected input at '{text[pos:pos + 15]}'")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'number':
+            number = value.lower().rstrip('%')
+            scale = _SUFFIXES.get(number[-1], 1)
+            value = float(number.rstrip('kmbt')) * scale
+        elif kind == 'string':
+            value = value[1:-1]
+        elif kind == 'word':
+            lowered = value.lower()
+            if lowered in ('and', 'or', 'not'):
+                kind, value = lowered, lowered
+            elif lowered in FIELDS:
+                value = FIELDS[lowered]
+            else:
+                raise ValueError(f"unknown field '{value}' (try one of: {', '.join(sorted(FIELDS))})")
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over: or > and > not > comparison / (group) / boolean field."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kind=None):
+        token = self.peek()
+        if token[0] is None:
+            raise ValueError("the filter ends too early")
+        if kind and token[0] != kind:
+            raise ValueError(f"expected {kind} before '{token[1]}'")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"unexpected '{self.peek()[1]}'")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek()[0] == 'or':
+            self.take()
+            left, right = node, self.parse_and()
+            node = lambda frame, left=left, right=right: left(frame) | right(frame)
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek()[0] == 'and':
+            self.take()
+            left, right = node, self.parse_not()
+            node = lambda frame, left=left, right=right: left(frame) & right(frame)
+        return node
+
+    def parse_not(self):
+        if self.peek()[0] == 'not':
+            self.take()
+            inner = self.parse_not()
+            return lambda frame: ~inner(frame)
+        return self.parse_atom()
+
+    def parse_atom(self):
+        if self.peek() == ('paren', '('):
+            self.take()
+            node = self.parse_or()
+            if self.take('paren')[1] != ')':
+                raise ValueError("expected ')'")
+            return node
+        left = self.take()
+        if self.peek()[0] != 'op':
+            if left[0] == 'word' and left[1] in BOOL_COLUMNS:
+                column = left[1]
+                return lambda frame: frame[column].fillna(False).astype(bool)
+            raise ValueError(f"expected a comparison after '{left[1]}'")
+        op = self.take('op')[1]
+        right = self.take()
+        return _comparison(left, op, right)
+
+
+def _comparison(left, op, right):
+    kinds = {left[0], right[0]}
+    if not kinds <= {'word', 'number', 'string'} or kinds == {'number'} or kinds == {'string'}:
+        raise ValueError(f"cannot compare '{left[1]}' {op} '{right[1]}'")
+    if 'string' in kinds:
+        field, literal = (left, right) if left[0] == 'word' else (right, left)
+        if field[1] not in TEXT_COLUMNS or op not in ('=', '==', '!='):
+            raise ValueError(f"text can only be matched with = or != on {', '.join(sorted(TEXT_COLUMNS))}")
+        column, value = field[1], literal[1].lower()
+        match = lambda frame: frame[column].str.lower() == value
+        return match if op != '!=' else (lambda frame: ~match(frame))
+    for token in (left, right):
+        if token[0] == 'word' and token[1] in TEXT_COLUMNS:
+            raise ValueError(f"'{token[1]}' is text; compare it with a quoted string")
+    compare = _COMPARE[op]
+
+    def operand(token, frame):
+        return frame[token[1]].astype(float) if token[0] == 'word' else token[1]
+    return lambda frame: pd.Series(compare(operand(left, frame), operand(right, frame)), index=frame.index)
+
+
+def parse_query(text):
+    """Compile a screener query into a function frame -> boolean mask.
+
+    Raises ValueError with a readable message on anything it can't parse.
+    """
+    tokens = _tokenize(text)
+    if not tokens:
+        return lambda frame: pd.Series(True, index=frame.index)
+    return _Parser(tokens).parse()
+
+
+def screen(frame, query='', sort_by='MarketCap', ascending=False, limit=None):
+    """Rows of the index matching `query`, sorted; Symbol becomes a column."""
+    frame = frame.rename_axis('Symbol').reset_index()
+    result = frame[parse_query(query)(frame).to_numpy(dtype=bool)]
+    if sort_by:
+        result = result.sort_values(sort_by, ascending=ascending, na_position='last')
+    return result.head(limit) if limit else result
+
+
+def _naive(index):
+    return index.tz_localize(None) if getattr(index, 'tz', None) is not None else index
+
+
+def indicator_rows(histories):
+    """Latest indicator values for each {symbol: daily OHLCV frame}, one vectorized pass."""
+    closes = align(pd.DataFrame({symbol: pd.Series(df['Close'].to_numpy(dtype=np.float64),
+                                                   index=_naive(df.index))
+                                 for symbol, df in histories.items()}))
+    panel = indicators_panel(closes.to_numpy())
+    latest = dict(zip(INDICATOR_COLUMNS, panel[:, -1, :]))
+    price = closes.to_numpy()[-1]
+    rows = pd.DataFrame({
+        'Price': price,
+        'RSI': latest['RSI'],
+        'MA20': latest['MA20'],
+        'MA50': latest['MA50'],
+        'MA200': latest['MA200'],
+        'MACD': latest['MACD'],
+        'Signal': latest['Signal_Line'],
+        'BB_Upper': latest['BB_upper'],
+        'BB_Lower': latest['BB_lower'],
+    }, index=closes.columns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rows['BB_Position'] = (rows['Price'] - rows['BB_Lower']) / (rows['BB_Upper'] - rows['BB_Lower'])
+    rows['Golden_Cross'] = rows['MA50'] > rows['MA200']
+    rows['MACD_Bullish'] = rows['MACD'] > rows['Signal']
+    rows['Change'] = [_change(histories[symbol]['Close']) for symbol in rows.index]
+    rows['LastBar'] = [_naive(histories[symbol].index)[-1] for symbol in rows.index]
+    return rows
+
+
+def _change(close):
+    if len(close) < 2 or not close.iloc[-2]:
+        return np.nan
+    return (close.iloc[-1] / close.iloc[-2] - 1) * 100
+
+
+def _moved(df, row):
+    # Today's bar keeps its timestamp while its close moves during the session
+    if not len(df):
+        return False
+    return _naive(df.index)[-1] != row['LastBar'] or df['Close'].iloc[-1] != row['Price']
+
+
+def _fundamentals(info):
+    return {'PE': info.get('trailingPE', np.nan), 'MarketCap': info.get('marketCap', np.nan)}
+
+
+class ScreenerIndex:
+    """Process-wide screener index backed by a Parquet file."""
+
+    def __init__(self, path, universe_path, store=price_store):
+        self.path = path
+        self.universe_path = universe_path
+        self.store = store
+        self.updated_at = 0.0
+        self._frame = None
+        self._refresh_lock = threading.Lock()
+
+    def _empty(self):
+        return pd.DataFrame(columns=INDEX_COLUMNS).rename_axis('Symbol')
+
+    def frame(self):
+        """The current index (loaded from disk on first use); empty if never built."""
+        if self._frame is None:
+            frame = self._empty()
+            if os.path.exists(self.path):
+                try:
+                    frame = pd.read_parquet(self.path)
+                    self.updated_at = os.path.getmtime(self.path)
+                except Exception as e:
+                    print(f"Error reading screener index: {str(e)}")
+            self._frame = frame
+        return self._frame
+
+    def _save(self, frame):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f'{self.path}.tmp'
+        frame.to_parquet(tmp)
+        os.replace(tmp, self.path)
+
+    def refresh(self, max_age=config.SCREENER_REFRESH_INTERVAL):
+        """Bring the index up to date unless it is younger than `max_age` seconds.
+
+        Returns False only when a refresh ran and produced no rows. A refresh
+        already running in another thread makes this a no-op.
+        """
+        previous = self.frame()
+        if time.time() - self.updated_at < max_age and len(previous):
+            return True
+        if not self._refresh_lock.acquire(blocking=False):
+            return True
+        try:
+            frame = self._rebuild(previous)
+        finally:
+            self._refresh_lock.release()
+        return len(frame) > 0
+
+    def _rebuild(self, previous):
+        universe = load_universe(self.universe_path)
+        symbols = list(universe.index)
+        frame = previous.reindex(symbols)
+        frame['Name'] = universe['Name']
+        frame['Sector'] = universe['Sector']
+
+        histories = fetch_many(symbols, lambda symbol: self.store.load(symbol, config.SCREENER_PERIOD, '1d'))
+        changed = {symbol: df for symbol, df in histories.items() if _moved(df, frame.loc[symbol])}
+        if changed:
+            rows = indicator_rows(changed)
+            frame.loc[rows.index, rows.columns] = rows
+
+        now = time.time()
+        stale = [symbol for symbol in symbols
+                 if not now - (frame.at[symbol, 'InfoAt'] if pd.notna(frame.at[symbol, 'InfoAt']) else 0)
+                 < config.SCREENER_INFO_MAX_AGE]
+        infos = fetch_many(stale, lambda symbol: cached('info', symbol, lambda: get_provider().info(symbol)))
+        for symbol, info in infos.items():
+            for column, value in _fundamentals(info or {}).items():
+                frame.at[symbol, column] = value
+            frame.at[symbol, 'InfoAt'] = now
+
+        frame = frame[frame['Price'].notna()]
+        for column in INDEX_COLUMNS:
+            if column not in TEXT_COLUMNS and column not in BOOL_COLUMNS and column != 'LastBar':
+                frame[column] = pd.to_numeric(frame[column], errors='coerce')
+        frame['Golden_Cross'] = frame['Golden_Cross'].astype(bool)
+        frame['MACD_Bullish'] = frame['MACD_Bullish'].astype(bool)
+        frame['LastBar'] = pd.to_datetime(frame['LastBar'])
+        frame = frame[INDEX_COLUMNS].rename_axis('Symbol')
+        try:
+            self._save(frame)
+        except OSError as e:
+            print(f"Error saving screener index: {str(e)}")
+        self._frame = frame
+        self.updated_at = time.time()
+        return frame
+
+
+screener_index = ScreenerIndex(config.SCREENER_INDEX_PATH, config.SCREENER_UNIVERSE)
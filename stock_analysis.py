@@ -1,11 +1,31 @@
 import streamlit as st
-import plotly.express as px
 from utils import (
-    get_stock_data, create_candlestick_chart, get_trending_stocks,
-    get_stock_news, calculate_technical_indicators, get_company_info,
-    init_watchlist_db, add_to_watchlist, remove_from_watchlist, get_watchlist
+    create_candlestick_chart, get_batch_quotes, get_price_matrix, get_stock_history,
+    init_watchlist_db, submit_fetch, sync_news, trending_frame, fetch_quote_info
 )
+from watchlist import load_watchlist, add_symbol, edit_watchlist, remove_symbol, symbols_from_csv
+from context import PageContext
+from deferred import DeferredRenders
+from indicators import incremental_indicators
+from charts import (
+    cached_figure, decimate_lines, decimation_report, figure_from_json, figure_points, heatmap_figure, line_figure,
+    line_point_budget
+)
+from compare import compare, parse_symbols
+from backtest import RULES, backtest, sweep
+from screener import SORTABLE, screen, screener_index
+from news import news_index
+from overview import overview_snapshots
+from prefetch import record_activity
+import math
+import sqlite3
+import pandas as pd
+import time
 from datetime import datetime
+import config
+from cache import figure_cache, market_cache, stale
+from history import history_memory_report
+from metrics import registry
 
 def render_footer():
     st.markdown("""
@@ -43,10 +63,586 @@ def render_stock_card(stock, is_clickable=True):
     """
     return st.markdown(card_html, unsafe_allow_html=True)
 
+def render_cache_stats():
+    stats = market_cache.stats()
+    with st.sidebar.expander("Cache statistics"):
+        st.write(f"Entries: {stats['size']} / {stats['maxsize']}")
+        st.write(f"Hit rate: {stats['totals']['hit_rate']:.1%}")
+        figures = figure_cache.stats()
+        st.write(f"Figures: {figures['size']} / {figures['maxsize']} ({figures['totals']['hit_rate']:.1%} hits)")
+        st.table({kind: counters for kind, counters in sorted(stats['kinds'].items())})
+        memory = history_memory_report()
+        if memory:
+            total = sum(row['bytes'] for row in memory)
+            full = sum(row['float64_bytes'] for row in memory)
+            st.write(f"History frames: {total / 1024:,.0f} KB (~{full / 1024:,.0f} KB as full float64 frames)")
+            st.dataframe(memory, hide_index=True, use_container_width=True)
+
+def render_metrics_panel():
+    summary = registry.summary()
+    with st.sidebar.expander("Performance metrics"):
+        if not summary['functions']:
+            st.write("No calls recorded yet")
+            return
+        st.dataframe(summary['functions'], hide_index=True, use_container_width=True)
+        st.table({kind: counts for kind, counts in sorted(summary['cache'].items())})
+        st.download_button("Download (Prometheus)", registry.prometheus(),
+                           file_name="metrics.prom", mime="text/plain")
+
+def render_chart(fig, original_points):
+    st.plotly_chart(fig, use_container_width=True)
+    if config.SHOW_CHART_PAYLOAD:
+        report = decimation_report(original_points, figure_points(fig), len(fig.to_json()))
+        st.caption(
+            f"{report['points_before']:,} → {report['points_after']:,} points, "
+            f"~{report['bytes_before_estimate'] / 1024:,.0f} KB → {report['bytes_after'] / 1024:,.0f} KB"
+        )
+
+@st.fragment(run_every=config.QUOTES_REFRESH_SECONDS or None)
+def render_watchlist_panel(email):
+    # Reruns on its own timer; only this panel refreshes, not the page
+    record_activity()
+    watchlist = load_watchlist(email)
+    if not watchlist:
+        st.info("Your watchlist is empty")
+        return
+
+    quotes = get_batch_quotes(watchlist)
+    for watch_symbol in watchlist:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            quote = quotes.get(watch_symbol)
+            if quote:
+                color = "green" if quote['Change'] > 0 else "red"
+                st.markdown(
+                    f"📈 **{watch_symbol}** ${quote['Price']:.2f} "
+                    f"<span style='color: {color};'>{quote['Change']:+.2f}%</span>",
+                    unsafe_allow_html=True
+                )
+            else:
+                st.write(f"📈 {watch_symbol}")
+        with col2:
+            if st.button("❌", key=f"remove_{watch_symbol}"):
+                remove_symbol(email, watch_symbol)
+                st.rerun()
+
+def render_watchlist_editor(email, watchlist):
+    # A form submits every edit together: one transaction and one rerun
+    with st.expander("Edit watchlist"):
+        with st.form("watchlist_editor", clear_on_submit=True):
+            typed = st.text_input("Add symbols", placeholder="AAPL, MSFT, NVDA")
+            upload = st.file_uploader("Import CSV", type="csv", help="A Symbol column, or symbols in the first column")
+            remove = st.multiselect("Remove", watchlist)
+            order = st.multiselect("Move to top", watchlist, help="Picked symbols move to the top in the order picked")
+            submitted = st.form_submit_button("Apply")
+        if not submitted:
+            return
+        add = parse_symbols(typed, limit=config.WATCHLIST_MAX_SYMBOLS)
+        if upload is not None:
+            add += symbols_from_csv(upload.getvalue())
+        if add or remove or order:
+            added, removed = edit_watchlist(email, add=add, remove=remove, order=order)
+            st.toast(f"Watchlist updated: {len(added)} added, {removed} removed")
+            st.rerun()
+
+def render_quote_header(info, current_symbol, watchlist):
+    # Add to watchlist button
+    if current_symbol not in watchlist:
+        if st.button("➕ Add to Watchlist"):
+            add_symbol(st.session_state.email, current_symbol)
+            st.success(f"Added {current_symbol} to watchlist!")
+            st.rerun()
+
+    # Stock Info Section
+    st.markdown(f"### {info.get('shortName', current_symbol)} Analysis")
+
+    # Price metrics in a modern container
+    st.markdown('<div class="metrics-container">', unsafe_allow_html=True)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(
+            "Current Price",
+            f"${info.get('currentPrice', 0):.2f}",
+            f"{info.get('regularMarketChangePercent', 0):.2f}%"
+        )
+    with col2:
+        st.metric(
+            "Day High",
+            f"${info.get('dayHigh', 0):.2f}"
+        )
+    with col3:
+        st.metric(
+            "Day Low",
+            f"${info.get('dayLow', 0):.2f}"
+        )
+    with col4:
+        st.metric(
+            "Volume",
+            f"{info.get('volume', 0):,.0f}"
+        )
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def render_price_chart(df, current_symbol, chart_type, timeframe, interval):
+    fig = cached_figure(current_symbol, chart_type, df,
+                        lambda: create_candlestick_chart(df, current_symbol, chart_type),
+                        timeframe, interval)
+    render_chart(fig, len(df))
+
+def render_chart_tab(page, deferred, current_symbol, chart_type, timeframe, interval, watchlist):
+    if current_symbol:
+        # Both requests run at once; each part renders when its data arrives.
+        # The quote goes through the page context so the Company Info tab reuses it
+        history = submit_fetch(get_stock_history, current_symbol, timeframe, interval)
+        deferred.defer(
+            page.symbol(current_symbol).fetch_info(),
+            lambda info: render_quote_header(info, current_symbol, watchlist),
+            stale=lambda: stale('quote', current_symbol)
+        )
+        deferred.defer(
+            history,
+            lambda df: render_price_chart(df, current_symbol, chart_type, timeframe, interval),
+            stale=lambda: stale('history', current_symbol, timeframe, interval)
+        )
+
+def render_company_tab(page, symbol):
+    if symbol:
+        company_info = page.symbol(symbol).company_info
+        if company_info:
+            st.markdown(f"### About {company_info['Name']}")
+            st.markdown(company_info['Description'])
+
+            st.markdown("### Key Statistics")
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                st.metric("Sector", company_info['Sector'])
+                st.metric("P/E Ratio", company_info['PE Ratio'])
+                st.metric("52 Week High", f"${company_info['52 Week High']:.2f}")
+
+            with col2:
+                st.metric("Industry", company_info['Industry'])
+                st.metric("Market Cap", f"${company_info['Market Cap']/1e9:.2f}B")
+                st.metric("52 Week Low", f"${company_info['52 Week Low']:.2f}")
+
+            with col3:
+                st.metric("Website", company_info['Website'])
+                st.metric("Volume", f"{company_info['Volume']:,.0f}")
+                st.metric("Avg Volume", f"{company_info['Avg Volume']:,.0f}")
+
+def render_technical_tab(page, symbol, current_symbol, timeframe, interval, watchlist):
+    df = page.symbol(current_symbol).history(timeframe, interval) if current_symbol else None
+    if symbol and df is not None:
+        st.markdown("### Technical Analysis")
+
+        # Analysis explanation
+        with st.expander("📊 Understanding Technical Indicators"):
+            st.markdown("""
+                - **Moving Averages**: Help identify trends
+                    - MA20: Short-term trend
+                    - MA50: Medium-term trend
+                    - MA200: Long-term trend
+
+                - **RSI (Relative Strength Index)**:
+                    - Above 70: Potentially overbought
+                    - Below 30: Potentially oversold
+
+                - **MACD (Moving Average Convergence Divergence)**:
+                    - Signals potential trend changes
+                    - When MACD crosses above Signal Line: Bullish
+                    - When MACD crosses below Signal Line: Bearish
+
+                - **Bollinger Bands**:
+                    - Help identify volatility and potential price levels
+                    - Price near upper band: Potentially overbought
+                    - Price near lower band: Potentially oversold
+            """)
+
+        df_technical = incremental_indicators((current_symbol, timeframe, interval), df)
+        if df_technical is not None:
+            half_width = line_point_budget(config.CHART_WIDTH_PX // 2)
+
+            def technical_figure(name, columns, title, budget=None, hlines=()):
+                return cached_figure(
+                    current_symbol, name, df_technical,
+                    lambda: line_figure(decimate_lines(df_technical, columns, budget), columns, title, hlines=hlines),
+                    timeframe, interval
+                )
+
+            # Moving Averages
+            fig_ma = technical_figure('ma', ['Close', 'MA20', 'MA50', 'MA200'], 'Price and Moving Averages')
+            render_chart(fig_ma, len(df_technical))
+
+            col1, col2 = st.columns(2)
+            with col1:
+                # RSI Chart
+                fig_rsi = technical_figure('rsi', ['RSI'], 'Relative Strength Index (RSI)', half_width,
+                                           hlines=[(70, "red"), (30, "green")])
+                render_chart(fig_rsi, len(df_technical))
+
+            with col2:
+                # MACD Chart
+                fig_macd = technical_figure('macd', ['MACD', 'Signal_Line'], 'MACD and Signal Line', half_width)
+                render_chart(fig_macd, len(df_technical))
+
+            # Bollinger Bands
+            fig_bb = technical_figure('bb', ['Close', 'BB_upper', 'BB_middle', 'BB_lower'], 'Bollinger Bands')
+            render_chart(fig_bb, len(df_technical))
+
+            with st.expander("🧪 Backtest these signals"):
+                # Expander bodies always execute, so the backtest runs only once asked for
+                if st.toggle("Run backtest", key="backtest_enabled"):
+                    render_backtest_panel(df_technical, current_symbol, watchlist, timeframe, interval)
+
+def render_backtest_panel(df_technical, current_symbol, watchlist, timeframe, interval):
+    rule = st.selectbox("Rule", list(RULES), format_func=lambda name: RULES[name][0], key="backtest_rule")
+    defaults = RULES[rule][2]
+    columns = st.columns(len(defaults))
+    params = {
+        name: column.number_input(name.title(), value=value, min_value=1 if isinstance(value, int) else 0.1,
+                                  key=f"backtest_{rule}_{name}")
+        for column, (name, value) in zip(columns, defaults.items())
+    }
+
+    # Default windows reuse the indicator columns already on screen
+    result = backtest(df_technical, rule, params, interval)
+    stats = result['stats']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Strategy Return", f"{stats['Total Return']:.1%}", f"{stats['Total Return'] - stats['Buy & Hold']:+.1%} vs hold")
+    col2.metric("Max Drawdown", f"{stats['Max Drawdown']:.1%}")
+    # Sharpe has no value for a flat equity curve
+    col3.metric("Sharpe", "N/A" if math.isnan(stats['Sharpe']) else f"{stats['Sharpe']:.2f}")
+    col4.metric("Trades", stats['Trades'], f"{stats['Win Rate']:.0%} won" if stats['Trades'] else None)
+
+    curves = pd.DataFrame({
+        'Strategy': result['equity'],
+        'Buy & Hold': df_technical['Close'] / df_technical['Close'].iloc[0],
+    })
+    drawdown = result['drawdown'].to_frame()
+    key = (rule, tuple(params.items()), timeframe, interval)
+    fig_equity = cached_figure(current_symbol, 'backtest_equity', df_technical,
+                               lambda: line_figure(decimate_lines(curves, list(curves)), list(curves), 'Growth of $1'),
+                               *key)
+    render_chart(fig_equity, len(curves))
+    fig_drawdown = cached_figure(current_symbol, 'backtest_drawdown', df_technical,
+                                 lambda: line_figure(decimate_lines(drawdown, ['Drawdown']), ['Drawdown'], 'Drawdown',
+                                                     fill='tozeroy'),
+                                 *key)
+    render_chart(fig_drawdown, len(drawdown))
+    if len(result['trades']):
+        st.dataframe(result['trades'].style.format({'Return': '{:.2%}'}), use_container_width=True, hide_index=True)
+
+    st.markdown("#### Parameter sweep")
+    text = st.text_input(
+        "Sweep symbols",
+        value=", ".join(dict.fromkeys([current_symbol] + watchlist)),
+        key="backtest_sweep_symbols",
+        help=f"Every combination of {', '.join(RULES[rule][3])} is tested on each symbol"
+    )
+    if st.button("Run sweep", key="backtest_sweep_run"):
+        closes = get_price_matrix(parse_symbols(text), timeframe, interval)
+        if closes is None or closes.empty:
+            st.error("Could not load prices for these symbols")
+            return
+        with st.spinner("Running backtests..."):
+            st.session_state.backtest_sweep = (rule, sweep(closes, rule, interval=interval))
+    if st.session_state.get('backtest_sweep', (None,))[0] == rule:
+        table = st.session_state.backtest_sweep[1]
+        st.dataframe(
+            table.head(config.BACKTEST_SWEEP_ROWS).style.format({
+                'Total Return': '{:.1%}', 'Annual Return': '{:.1%}', 'Volatility': '{:.1%}', 'Sharpe': '{:.2f}',
+                'Max Drawdown': '{:.1%}', 'Win Rate': '{:.0%}', 'Avg Trade': '{:.2%}', 'Exposure': '{:.0%}',
+                'Buy & Hold': '{:.1%}'
+            }, na_rep='N/A'),
+            use_container_width=True, hide_index=True
+        )
+
+def render_news_tab(symbol):
+    if symbol:
+        st.markdown("### Latest News & Analysis")
+        sync_news(symbol)
+
+        query = st.text_input("Search news", placeholder="Keywords, e.g. earnings guidance")
+        try:
+            total = news_index.count(symbol, query)
+            pages = max(1, math.ceil(total / config.NEWS_PAGE_SIZE))
+            page_number = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+            news_articles = news_index.page(symbol, query, page_number - 1)
+        except sqlite3.Error as e:
+            print(f"Error reading news index for {symbol}: {str(e)}")
+            st.error("Could not load news right now. Please try again.")
+            return
+        if news_articles:
+            st.caption(f"{total} articles · page {page_number} of {pages}")
+            for article in news_articles:
+                with st.expander(f"📰 {article['title']}"):
+                    st.markdown(f"""
+                        **Published**: {article['published']}  
+                        **Source**: {article['publisher']}  
+
+                        {article['summary']}  
+
+                        [Read full article]({article['link']})
+                    """)
+        elif query:
+            st.info("No articles match your search.")
+        else:
+            st.info("No recent news articles found for this stock.")
+
+def render_comparison_tab(current_symbol, watchlist, timeframe, interval):
+    st.markdown("### Compare Stocks")
+    defaults = [current_symbol] + [s for s in watchlist if s != current_symbol]
+    if len(defaults) < 2:
+        defaults += [s for s in config.TRENDING_SYMBOLS if s not in defaults][:4]
+    text = st.text_area(
+        "Symbols",
+        value=", ".join(defaults[:config.COMPARE_MAX_SYMBOLS]),
+        help=f"Up to {config.COMPARE_MAX_SYMBOLS} symbols, separated by commas or spaces"
+    )
+    symbols = parse_symbols(text)
+    if len(symbols) < 2:
+        st.info("Enter at least two symbols to compare")
+        return
+
+    closes = get_price_matrix(symbols, timeframe, interval)
+    if closes is None or closes.empty:
+        st.error("Could not load prices for these symbols")
+        return
+    missing = [s for s in symbols if s not in closes.columns]
+    if missing:
+        st.warning(f"No data for: {', '.join(missing)}")
+
+    result = compare(closes, interval)
+    normalized = result['normalized']
+    columns = list(normalized.columns)
+
+    def returns_figure():
+        fig = line_figure(decimate_lines(normalized, columns), columns, 'Cumulative Return (%)')
+        return fig.update_layout(yaxis_title='Return (%)')
+
+    key = ','.join(closes.columns)
+    fig = cached_figure(key, 'compare', closes, returns_figure, timeframe, interval)
+    render_chart(fig, len(normalized))
+
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        heatmap = cached_figure(key, 'correlation', closes,
+                                lambda: heatmap_figure(result['correlation'], 'Return Correlation'),
+                                timeframe, interval)
+        st.plotly_chart(heatmap, use_container_width=True)
+    with col2:
+        st.markdown("#### Relative Strength")
+        st.dataframe(
+            result['rankings'].style.format({
+                'Return': '{:.2%}', 'Volatility': '{:.1%}', 'Relative Strength': '{:.2f}'
+            }),
+            use_container_width=True
+        )
+
+def render_screener_tab():
+    st.markdown("### Stock Screener")
+    if st.button("🔄 Refresh index"):
+        with st.spinner("Updating screener index..."):
+            screener_index.refresh(max_age=0)
+    index = screener_index.frame()
+    if index.empty:
+        with st.spinner("Building screener index..."):
+            screener_index.refresh(max_age=0)
+        index = screener_index.frame()
+        if index.empty:
+            st.error("Could not build the screener index")
+            return
+    age_minutes = (time.time() - screener_index.updated_at) / 60
+    st.caption(f"{len(index)} symbols · updated {age_minutes:.0f} min ago")
+
+    query = st.text_input(
+        "Filter",
+        placeholder="RSI < 30 and price > MA200",
+        help="Compare fields (price, change, rsi, ma20, ma50, ma200, macd, signal, bb_position, pe, "
+             "market_cap, sector) with < <= > >= = !=, combine with and/or/not and parentheses. "
+             "golden_cross and macd_bullish are true/false flags; numbers take k/m/b/t suffixes."
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        sort_by = st.selectbox("Sort by", SORTABLE)
+    with col2:
+        ascending = st.checkbox("Ascending", value=sort_by == 'Symbol')
+
+    try:
+        results = screen(index, query, sort_by, ascending, config.SCREENER_RESULTS_LIMIT)
+    except ValueError as e:
+        st.error(f"Invalid filter: {str(e)}")
+        return
+    st.write(f"{len(results)} matches")
+    st.dataframe(
+        results.drop(columns=['LastBar', 'InfoAt']).style.format({
+            'Price': '${:,.2f}', 'Change': '{:+.2f}%', 'RSI': '{:.1f}', 'MA20': '{:,.2f}', 'MA50': '{:,.2f}',
+            'MA200': '{:,.2f}', 'MACD': '{:.2f}', 'Signal': '{:.2f}', 'BB_Upper': '{:,.2f}',
+            'BB_Lower': '{:,.2f}', 'BB_Position': '{:.2f}', 'PE': '{:.1f}', 'MarketCap': '{:,.0f}'
+        }, na_rep='N/A'),
+        hide_index=True,
+        use_container_width=True
+    )
+
+def render_trending_card(symbol, stock):
+    # Make the stock card clickable
+    if st.button(f"View {symbol}", key=f"view_{symbol}"):
+        st.session_state.selected_stock = symbol
+        st.session_state.detailed_view_stock = symbol
+        st.rerun()
+    render_stock_card(stock)
+
+def render_index_chart(idx, name, index_df):
+    if len(index_df):
+        fig = cached_figure(idx, 'index', index_df, lambda: line_figure(index_df, ['Close'], name), '1mo')
+        st.plotly_chart(fig, use_container_width=True)
+
+def quote_or_profile(symbol):
+    info, age = stale('quote', symbol)
+    # With no quote at all, the company profile cache can still fill the details
+    return (info, age) if info is not None else ({}, None)
+
+def render_company_detail(detailed, info=None):
+    if info:
+        detailed.seed_info(info)
+    company_info = detailed.company_info
+    if company_info:
+        # Company description
+        st.markdown(f"### About {company_info['Name']}")
+        st.markdown(company_info['Description'])
+
+        # Financial metrics
+        metrics_col1, metrics_col2, metrics_col3 = st.columns(3)
+
+        with metrics_col1:
+            st.metric("Sector", company_info['Sector'])
+            st.metric("P/E Ratio", company_info['PE Ratio'])
+            st.metric("52 Week High", f"${company_info['52 Week High']:.2f}")
+
+        with metrics_col2:
+            st.metric("Industry", company_info['Industry'])
+            st.metric("Market Cap", f"${company_info['Market Cap']/1e9:.2f}B")
+            st.metric("52 Week Low", f"${company_info['52 Week Low']:.2f}")
+
+        with metrics_col3:
+            st.metric("Website", company_info['Website'])
+            st.metric("Volume", f"{company_info['Volume']:,.0f}")
+            st.metric("Avg Volume", f"{company_info['Avg Volume']:,.0f}")
+
+        # Recent news
+        st.markdown("### Recent News")
+        news_articles = detailed.news
+        if news_articles:
+            for article in news_articles[:3]:  # Show just 3 recent news items
+                with st.expander(f"📰 {article['title']}"):
+                    st.markdown(f"""
+                        **Published**: {article['published']}  
+                        **Source**: {article['publisher']}  
+
+                        {article['summary']}  
+
+                        [Read full article]({article['link']})
+                    """)
+        else:
+            st.info("No recent news articles found for this stock.")
+
+        # Close detailed view button
+        if st.button("Close Detailed View"):
+            st.session_state.detailed_view_stock = None
+            st.rerun()
+    else:
+        st.error(f"Could not retrieve detailed information for {detailed.symbol}")
+        if st.button("Close"):
+            st.session_state.detailed_view_stock = None
+            st.rerun()
+
+def render_market_overview_tab(page, deferred):
+    st.markdown("### Market Overview")
+    st.markdown("""
+        <div class="metrics-container">
+            This section provides a comprehensive view of market performance:
+            - Click on any stock card to view detailed analysis
+            - Track major market indices
+            - Monitor top trending stocks
+            - Analyze market movers
+        </div>
+    """, unsafe_allow_html=True)
+
+    # Every session reads the same prebuilt snapshot. Until the first one
+    # exists, fetch live and fill cards and charts in as they arrive
+    snapshot = overview_snapshots.current()
+    if snapshot is None:
+        quotes = {symbol: submit_fetch(fetch_quote_info, symbol) for symbol in config.TRENDING_SYMBOLS}
+        indices = {idx: submit_fetch(get_stock_history, idx, '1mo') for idx in config.MARKET_INDICES}
+        overview_snapshots.refresh_after(list(quotes.values()) + list(indices.values()))
+        symbols = list(quotes)
+    else:
+        stocks = dict(zip(snapshot.trending['Symbol'], snapshot.trending.to_dict('records')))
+        symbols = list(stocks)
+
+    # Display trending stocks in a modern card layout
+    st.subheader("🔥 Trending Stocks")
+    if snapshot is not None:
+        st.caption(f"Updated {datetime.fromtimestamp(snapshot.built_at).strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # Store the selected company for detailed view
+    if 'detailed_view_stock' not in st.session_state:
+        st.session_state.detailed_view_stock = None
+
+    for i in range(0, len(symbols), 2):
+        for column, symbol in zip(st.columns(2), symbols[i:i + 2]):
+            if snapshot is not None:
+                with column:
+                    render_trending_card(symbol, stocks[symbol])
+                continue
+            deferred.defer(
+                quotes[symbol],
+                lambda info, symbol=symbol: render_trending_card(symbol, trending_frame({symbol: info}).iloc[0]),
+                stale=lambda symbol=symbol: stale('quote', symbol),
+                placeholder=column.empty()
+            )
+
+    # Display detailed company information if a stock is selected
+    if st.session_state.detailed_view_stock:
+        st.markdown("---")
+        st.subheader(f"📊 Detailed Company Information: {st.session_state.detailed_view_stock}")
+
+        detailed = page.symbol(st.session_state.detailed_view_stock)
+        # A trending symbol's quote snapshot also carries its company profile
+        if snapshot is not None:
+            if detailed.symbol in snapshot.infos:
+                detailed.seed_info(snapshot.infos[detailed.symbol])
+            render_company_detail(detailed)
+        elif detailed.symbol in quotes:
+            deferred.defer(
+                quotes[detailed.symbol],
+                lambda info: render_company_detail(detailed, info),
+                stale=lambda: quote_or_profile(detailed.symbol)
+            )
+        else:
+            render_company_detail(detailed)
+
+    # Market Indices
+    st.subheader("📈 Major Indices")
+    for idx, name in config.MARKET_INDICES.items():
+        if snapshot is not None:
+            if idx in snapshot.figures:
+                st.plotly_chart(figure_from_json(snapshot.figures[idx]), use_container_width=True)
+            continue
+        deferred.defer(
+            indices[idx],
+            lambda index_df, idx=idx, name=name: render_index_chart(idx, name, index_df),
+            stale=lambda idx=idx: stale('history', idx, '1mo', '1d')
+        )
+
+
 def render_stock_analysis():
     # Initialize watchlist
     init_watchlist_db()
 
+    # Market data for this rerun, loaded once per symbol and shared by all tabs
+    page = PageContext()
+    deferred = DeferredRenders()
+
     st.markdown("""
         <h2 style='text-align: center; color: #1E88E5;'>Stock Market Analysis Dashboard</h2>
     """, unsafe_allow_html=True)
@@ -85,307 +681,52 @@ def render_stock_analysis():
 
     # Watchlist section in sidebar
     st.sidebar.markdown("## My Watchlist")
-    watchlist = get_watchlist(st.session_state.email)
-
-    if watchlist:
-        for watch_symbol in watchlist:
-            col1, col2 = st.sidebar.columns([3, 1])
-            with col1:
-                st.write(f"📈 {watch_symbol}")
-            with col2:
-                if st.button("❌", key=f"remove_{watch_symbol}"):
-                    remove_from_watchlist(st.session_state.email, watch_symbol)
-                    st.rerun()
-    else:
-        st.sidebar.info("Your watchlist is empty")
+    watchlist = load_watchlist(st.session_state.email)
+    with st.sidebar:
+        render_watchlist_panel(st.session_state.email)
+        render_watchlist_editor(st.session_state.email, watchlist)
 
     # Store the selected stock in session state
     if 'selected_stock' not in st.session_state:
         st.session_state.selected_stock = None
 
-    # Main content
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-        "Chart Analysis", 
-        "Company Info",
-        "Technical Indicators", 
-        "News & Updates", 
-        "Market Overview"
-    ])
-
-    with tab1:
-        # Use either the clicked stock or the manually entered symbol
-        current_symbol = st.session_state.selected_stock or symbol
-        if current_symbol:
-            df, info = get_stock_data(current_symbol, timeframe, interval)
-            if df is not None and info is not None:
-                # Add to watchlist button
-                if current_symbol not in watchlist:
-                    if st.button("➕ Add to Watchlist"):
-                        add_to_watchlist(st.session_state.email, current_symbol)
-                        st.success(f"Added {current_symbol} to watchlist!")
-                        st.rerun()
-
-                # Stock Info Section
-                st.markdown(f"### {info.get('shortName', current_symbol)} Analysis")
-
-                # Price metrics in a modern container
-                st.markdown('<div class="metrics-container">', unsafe_allow_html=True)
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric(
-                        "Current Price",
-                        f"${info.get('currentPrice', 0):.2f}",
-                        f"{info.get('regularMarketChangePercent', 0):.2f}%"
-                    )
-                with col2:
-                    st.metric(
-                        "Day High",
-                        f"${info.get('dayHigh', 0):.2f}"
-                    )
-                with col3:
-                    st.metric(
-                        "Day Low",
-                        f"${info.get('dayLow', 0):.2f}"
-                    )
-                with col4:
-                    st.metric(
-                        "Volume",
-                        f"{info.get('volume', 0):,.0f}"
-                    )
-                st.markdown('</div>', unsafe_allow_html=True)
-
-                # Chart
-                st.plotly_chart(
-                    create_candlestick_chart(df, current_symbol, chart_type),
-                    use_container_width=True
-                )
-
-    with tab2:
-        if symbol:
-            company_info = get_company_info(symbol)
-            if company_info:
-                st.markdown(f"### About {company_info['Name']}")
-                st.markdown(company_info['Description'])
-
-                st.markdown("### Key Statistics")
-                col1, col2, col3 = st.columns(3)
-
-                with col1:
-                    st.metric("Sector", company_info['Sector'])
-                    st.metric("P/E Ratio", company_info['PE Ratio'])
-                    st.metric("52 Week High", f"${company_info['52 Week High']:.2f}")
-
-                with col2:
-                    st.metric("Industry", company_info['Industry'])
-                    st.metric("Market Cap", f"${company_info['Market Cap']/1e9:.2f}B")
-                    st.metric("52 Week Low", f"${company_info['52 Week Low']:.2f}")
-
-                with col3:
-                    st.metric("Website", company_info['Website'])
-                    st.metric("Volume", f"{company_info['Volume']:,.0f}")
-                    st.metric("Avg Volume", f"{company_info['Avg Volume']:,.0f}")
-
-    with tab3:
-        if symbol and df is not None:
-            st.markdown("### Technical Analysis")
-
-            # Analysis explanation
-            with st.expander("📊 Understanding Technical Indicators"):
-                st.markdown("""
-                    - **Moving Averages**: Help identify trends
-                        - MA20: Short-term trend
-                        - MA50: Medium-term trend
-                        - MA200: Long-term trend
-
-                    - **RSI (Relative Strength Index)**:
-                        - Above 70: Potentially overbought
-                        - Below 30: Potentially oversold
-
-                    - **MACD (Moving Average Convergence Divergence)**:
-                        - Signals potential trend changes
-                        - When MACD crosses above Signal Line: Bullish
-                        - When MACD crosses below Signal Line: Bearish
-
-                    - **Bollinger Bands**:
-                        - Help identify volatility and potential price levels
-                        - Price near upper band: Potentially overbought
-                        - Price near lower band: Potentially oversold
-                """)
-
-            df_technical = calculate_technical_indicators(df)
-            if df_technical is not None:
-                # Moving Averages
-                fig_ma = px.line(df_technical, x=df_technical.index,
-                                  y=['Close', 'MA20', 'MA50', 'MA200'],
-                                  title='Price and Moving Averages')
-                fig_ma.update_layout(template='plotly_dark',
-                                      plot_bgcolor='rgba(19,47,76,0.8)',
-                                      paper_bgcolor='rgba(19,47,76,0.8)')
-                st.plotly_chart(fig_ma, use_container_width=True)
-
-                col1, col2 = st.columns(2)
-                with col1:
-                    # RSI Chart
-                    fig_rsi = px.line(df_technical, x=df_technical.index, y='RSI',
-                                      title='Relative Strength Index (RSI)')
-                    fig_rsi.update_layout(template='plotly_dark',
-                                          plot_bgcolor='rgba(19,47,76,0.8)',
-                                          paper_bgcolor='rgba(19,47,76,0.8)')
-                    fig_rsi.add_hline(y=70, line_dash="dash", line_color="red")
-                    fig_rsi.add_hline(y=30, line_dash="dash", line_color="green")
-                    st.plotly_chart(fig_rsi, use_container_width=True)
-
-                with col2:
-                    # MACD Chart
-                    fig_macd = px.line(df_technical, x=df_technical.index,
-                                       y=['MACD', 'Signal_Line'],
-                                       title='MACD and Signal Line')
-                    fig_macd.update_layout(template='plotly_dark',
-                                           plot_bgcolor='rgba(19,47,76,0.8)',
-                                           paper_bgcolor='rgba(19,47,76,0.8)')
-                    st.plotly_chart(fig_macd, use_container_width=True)
-
-                # Bollinger Bands
-                fig_bb = px.line(df_technical, x=df_technical.index,
-                                  y=['Close', 'BB_upper', 'BB_middle', 'BB_lower'],
-                                  title='Bollinger Bands')
-                fig_bb.update_layout(template='plotly_dark',
-                                      plot_bgcolor='rgba(19,47,76,0.8)',
-                                      paper_bgcolor='rgba(19,47,76,0.8)')
-                st.plotly_chart(fig_bb, use_container_width=True)
-
-    with tab4:
-        if symbol:
-            st.markdown("### Latest News & Analysis")
-            news_articles = get_stock_news(symbol)
-            if news_articles:
-                for article in news_articles:
-                    with st.expander(f"📰 {article['title']}"):
-                        st.markdown(f"""
-                            **Published**: {article['published']}  
-                            **Source**: {article['publisher']}  
-
-                            {article['summary']}  
-
-                            [Read full article]({article['link']})
-                        """)
-            else:
-                st.info("No recent news articles found for this stock.")
-
-    with tab5:
-        st.markdown("### Market Overview")
-        st.markdown("""
-            <div class="metrics-container">
-                This section provides a comprehensive view of market performance:
-                - Click on any stock card to view detailed analysis
-                - Track major market indices
-                - Monitor top trending stocks
-                - Analyze market movers
-            </div>
-        """, unsafe_allow_html=True)
+    # Use either the clicked stock or the manually entered symbol
+    current_symbol = st.session_state.selected_stock or symbol
 
-        # Display trending stocks in a modern card layout
-        st.subheader("🔥 Trending Stocks")
-        trending_df = get_trending_stocks()
-
-        # Store the selected company for detailed view
-        if 'detailed_view_stock' not in st.session_state:
-            st.session_state.detailed_view_stock = None
+    tab_renderers = {
+        "Chart Analysis": lambda: render_chart_tab(page, deferred, current_symbol, chart_type, timeframe, interval, watchlist),
+        "Company Info": lambda: render_company_tab(page, symbol),
+        "Technical Indicators": lambda: render_technical_tab(page, symbol, current_symbol, timeframe, interval, watchlist),
+        "News & Updates": lambda: render_news_tab(symbol),
+        "Market Overview": lambda: render_market_overview_tab(page, deferred),
+        "Comparison": lambda: render_comparison_tab(current_symbol, watchlist, timeframe, interval),
+        "Screener": render_screener_tab,
+    }
 
-        for i in range(0, len(trending_df), 2):
-            col1, col2 = st.columns(2)
+    # Main content
+    if config.LAZY_TABS:
+        # Only the selected tab fetches data and builds figures
+        active_tab = st.radio(
+            "Section",
+            list(tab_renderers),
+            horizontal=True,
+            key="active_tab",
+            label_visibility="collapsed"
+        )
+        tab_renderers[active_tab]()
+    else:
+        for tab, render_tab in zip(st.tabs(list(tab_renderers)), tab_renderers.values()):
+            with tab:
+                render_tab()
 
-            # First stock in the pair
-            with col1:
-                stock = trending_df.iloc[i]
-                # Make the stock card clickable
-                if st.button(f"View {stock['Symbol']}", key=f"view_{stock['Symbol']}"):
-                    st.session_state.selected_stock = stock['Symbol']
-                    st.session_state.detailed_view_stock = stock['Symbol']
-                    st.rerun()
-                render_stock_card(stock)
-
-            # Second stock in the pair (if exists)
-            if i + 1 < len(trending_df):
-                with col2:
-                    stock = trending_df.iloc[i + 1]
-                    if st.button(f"View {stock['Symbol']}", key=f"view_{stock['Symbol']}_2"):
-                        st.session_state.selected_stock = stock['Symbol']
-                        st.session_state.detailed_view_stock = stock['Symbol']
-                        st.rerun()
-                    render_stock_card(stock)
-                    
-        # Display detailed company information if a stock is selected
-        if st.session_state.detailed_view_stock:
-            st.markdown("---")
-            st.subheader(f"📊 Detailed Company Information: {st.session_state.detailed_view_stock}")
-            
-            company_info = get_company_info(st.session_state.detailed_view_stock)
-            if company_info:
-                # Company description
-                st.markdown(f"### About {company_info['Name']}")
-                st.markdown(company_info['Description'])
-                
-                # Financial metrics
-                metrics_col1, metrics_col2, metrics_col3 = st.columns(3)
-                
-                with metrics_col1:
-                    st.metric("Sector", company_info['Sector'])
-                    st.metric("P/E Ratio", company_info['PE Ratio'])
-                    st.metric("52 Week High", f"${company_info['52 Week High']:.2f}")
-                
-                with metrics_col2:
-                    st.metric("Industry", company_info['Industry'])
-                    st.metric("Market Cap", f"${company_info['Market Cap']/1e9:.2f}B")
-                    st.metric("52 Week Low", f"${company_info['52 Week Low']:.2f}")
-                
-                with metrics_col3:
-                    st.metric("Website", company_info['Website'])
-                    st.metric("Volume", f"{company_info['Volume']:,.0f}")
-                    st.metric("Avg Volume", f"{company_info['Avg Volume']:,.0f}")
-                
-                # Recent news
-                st.markdown("### Recent News")
-                news_articles = get_stock_news(st.session_state.detailed_view_stock)
-                if news_articles:
-                    for article in news_articles[:3]:  # Show just 3 recent news items
-                        with st.expander(f"📰 {article['title']}"):
-                            st.markdown(f"""
-                                **Published**: {article['published']}  
-                                **Source**: {article['publisher']}  
-                                
-                                {article['summary']}  
-                                
-                                [Read full article]({article['link']})
-                            """)
-                else:
-                    st.info("No recent news articles found for this stock.")
-                
-                # Close detailed view button
-                if st.button("Close Detailed View"):
-                    st.session_state.detailed_view_stock = None
-                    st.rerun()
-            else:
-                st.error(f"Could not retrieve detailed information for {st.session_state.detailed_view_stock}")
-                if st.button("Close"):
-                    st.session_state.detailed_view_stock = None
-                    st.rerun()
-
-        # Market Indices
-        st.subheader("📈 Major Indices")
-        indices = ['^GSPC', '^DJI', '^IXIC']
-        names = ['S&P 500', 'Dow Jones', 'NASDAQ']
-
-        for idx, name in zip(indices, names):
-            df, _ = get_stock_data(idx, '1mo')
-            if df is not None:
-                fig = px.line(df, y='Close', title=name)
-                fig.update_layout(
-                    template='plotly_dark',
-                    plot_bgcolor='rgba(19,47,76,0.8)',
-                    paper_bgcolor='rgba(19,47,76,0.8)'
-                )
-                st.plotly_chart(fig, use_container_width=True)
+    is_admin = st.session_state.email.lower() in config.ADMIN_EMAILS
+    if config.SHOW_CACHE_STATS or is_admin:
+        render_cache_stats()
+    if is_admin:
+        render_metrics_panel()
 
     # Render footer
-    render_footer()
\ No newline at end of file
+    render_footer()
+
+    # Fill in the sections still waiting on upstream data
+    deferred.drain()
\ No newline at end of file
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import PriceSeries, backtest, hold, ma_cross, simulate, sweep
+from indicators import calculate_technical_indicators
+
+
+def closes(count=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.015, count)))
+
+
+def test_hold_keeps_a_position_between_enter_and_exit():
+    enter = np.array([0, 1, 0, 0, 1, 0, 0, 0], dtype=bool)
+    exit = np.array([1, 0, 0, 1, 0, 0, 1, 0], dtype=bool)
+    assert hold(enter, exit).tolist() == [0, 1, 1, 0, 1, 1, 0, 0]
+
+
+def test_simulate_matches_a_bar_by_bar_loop():
+    close = closes()
+    position = ma_cross(PriceSeries(close), fast=5, slow=20)
+    cost = 0.001
+    result = simulate(close, position, cost)
+
+    equity, value, previous = [1.0], 1.0, 0.0
+    trades, entry = [], None
+    for t in range(len(close) - 1):
+        # The position decided at bar t's close is held over bar t + 1
+        value *= 1 + position[t] * (close[t + 1] / close[t] - 1) - abs(position[t] - previous) * cost
+        previous = position[t]
+        equity.append(value)
+    for t, held in enumerate(position):
+        if held and entry is None:
+            entry = t
+        elif not held and entry is not None:
+            trades.append(close[t] / close[entry] * (1 - cost) ** 2 - 1)
+            entry = None
+    if entry is not None:
+        trades.append(close[-1] / close[entry] * (1 - cost) ** 2 - 1)
+
+    np.testing.assert_allclose(result['equity'], equity, rtol=1e-12)
+    np.testing.assert_allclose(result['trades'], trades, rtol=1e-12)
+    assert result['stats']['Trades'] == len(trades) > 0
+
+
+def test_backtest_reuses_indicator_columns():
+    df = pd.DataFrame({'Close': closes()}, index=pd.bdate_range(end='2025-03-03', periods=400))
+    seeded = calculate_technical_indicators(df)
+    for rule in ('ma_cross', 'rsi', 'macd', 'bands'):
+        plain, reused = backtest(df, rule), backtest(seeded, rule)
+        pd.testing.assert_series_equal(plain['equity'], reused['equity'], rtol=1e-9)
+        assert plain['stats']['Trades'] == reused['stats']['Trades']
+
+
+def test_sweep_rows_match_single_backtests():
+    frame = pd.DataFrame({'AAA': closes(seed=1), 'BBB': closes(seed=2)},
+                         index=pd.bdate_range(end='2025-03-03', periods=400))
+    table = sweep(frame, 'ma_cross', {'fast': [5, 10], 'slow': [10, 50]}, workers=1)
+    # fast >= slow is skipped
+    assert len(table) == 2 * 3
+    row = table[(table['Symbol'] == 'BBB') & (table['fast'] == 5) & (table['slow'] == 50)].iloc[0]
+    expected = backtest(frame[['BBB']].rename(columns={'BBB': 'Close'}), 'ma_cross', {'fast': 5, 'slow': 50})
+    assert row['Total Return'] == pytest.approx(expected['stats']['Total Return'])
+    assert table['Sharpe'].is_monotonic_decreasing
@@ -0,0 +1,38 @@
+import threading
+import time
+
+from cache import TTLCache, refreshing
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(10, {'quote': 60})
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.1)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load(('AAPL', 'quote'), loader)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == [1]
+    assert results == ['value'] * 5
+
+
+def test_failed_load_lets_waiters_load_themselves():
+    cache = TTLCache(10, {'quote': 60})
+    assert cache.get_or_load(('AAPL', 'quote'), lambda: None) is None
+    assert cache.get_or_load(('AAPL', 'quote'), lambda: 'value') == 'value'
+
+
+def test_refreshing_reloads_a_cached_value():
+    cache = TTLCache(10, {'quote': 60})
+    cache.get_or_load(('AAPL', 'quote'), lambda: 'old')
+    with refreshing():
+        assert cache.get_or_load(('AAPL', 'quote'), lambda: 'new') == 'new'
+    assert cache.get_or_load(('AAPL', 'quote'), lambda: 'unused') == 'new'
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import config
+from cache import figure_cache, market_cache
+from charts import cached_figure, decimate_lines, decimate_ohlc, figure_points, line_figure, lttb_indices
+
+
+def frame(count=300):
+    index = pd.bdate_range(end='2025-03-03', periods=count)
+    return pd.DataFrame({'Close': np.linspace(10, 20, count)}, index=index)
+
+
+def test_cached_figure_builds_once_and_hands_out_copies():
+    figure_cache.clear()
+    df = frame()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return line_figure(df, ['Close'], 'Close')
+
+    first = cached_figure('TEST', 'close', df, build, '1y')
+    first.update_layout(title='changed')
+    first.data[0].name = 'changed'
+    second = cached_figure('TEST', 'close', df, build, '1y')
+    assert len(builds) == 1
+    assert second.layout.title.text == 'Close'
+    assert second.data[0].name == 'Close'
+    assert figure_points(second) == len(df)
+
+
+def test_cached_figure_rebuilds_when_the_last_bar_changes():
+    figure_cache.clear()
+    df = frame()
+    cached_figure('TEST', 'close', df, lambda: line_figure(df, ['Close'], 'Close'))
+    moved = df.copy()
+    moved.iloc[-1, 0] = 99.0
+    fig = cached_figure('TEST', 'close', moved, lambda: line_figure(moved, ['Close'], 'Moved'))
+    assert fig.layout.title.text == 'Moved'
+
+
+def test_cached_figure_rebuilds_when_past_bars_are_readjusted():
+    figure_cache.clear()
+    df = frame()
+    cached_figure('TEST', 'close', df, lambda: line_figure(df, ['Close'], 'Close'))
+    adjusted = df.copy()
+    adjusted.iloc[:100, 0] /= 2
+    fig = cached_figure('TEST', 'close', adjusted, lambda: line_figure(adjusted, ['Close'], 'Adjusted'))
+    assert fig.layout.title.text == 'Adjusted'
+
+
+def test_figures_have_their_own_bounded_cache():
+    market_cache.clear()
+    figure_cache.clear()
+    market_cache.set(('AAPL', 'quote', None, None), {'currentPrice': 1.0})
+    df = frame(10)
+    for i in range(config.FIGURE_CACHE_MAX_ENTRIES + 1):
+        cached_figure(f'S{i}', 'close', df, go.Figure)
+    assert figure_cache.stats()['size'] == config.FIGURE_CACHE_MAX_ENTRIES
+    assert market_cache.stats()['size'] == 1
+
+
+def test_lttb_keeps_the_ends_and_the_budget():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[500] = 10.0
+    keep = lttb_indices(x, y, 100)
+    assert len(keep) == 100
+    assert keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    assert 500 in keep
+    assert list(lttb_indices(x[:50], y[:50], 100)) == list(range(50))
+
+
+def test_series_within_the_budget_are_returned_unchanged():
+    df = frame(100)
+    assert decimate_lines(df, ['Close'], threshold=100) is df
+    assert decimate_ohlc(df, buckets=100) is df
+
+
+def test_ohlc_buckets_merge_their_bars():
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 1, 1000))
+    df = pd.DataFrame({'Open': close + rng.normal(0, 0.1, 1000), 'High': close + 1, 'Low': close - 1,
+                       'Close': close, 'Volume': rng.integers(1, 100, 1000).astype(float)},
+                      index=pd.date_range('2025-03-03 09:30', periods=1000, freq='min'))
+    merged = decimate_ohlc(df, buckets=64)
+    assert len(merged) == 64
+    # Each bucket spans the bars from its own start up to the next bucket's start
+    groups = df.groupby(np.searchsorted(merged.index, df.index, side='right') - 1)
+    expected = groups.agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+    np.testing.assert_array_equal(merged.to_numpy(), expected.to_numpy())
+    assert merged.index[0] == df.index[0]
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from compare import align, bar_returns, compare, last_valid, parse_symbols, rankings
+
+
+def closes():
+    index = pd.bdate_range(end='2025-03-03', periods=60)
+    prices = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 60)))
+    return pd.DataFrame({'AAA': prices, 'BBB': prices * 2}, index=index)
+
+
+def test_parse_symbols():
+    assert parse_symbols('aapl, msft;aapl  nvda', limit=2) == ['AAPL', 'MSFT']
+
+
+def test_align_drops_empty_rows_and_columns():
+    frame = closes()
+    frame['CCC'] = np.nan
+    frame.iloc[10, :] = np.nan
+    frame.iloc[20, 1] = np.nan
+    filled = align(frame)
+    assert list(filled.columns) == ['AAA', 'BBB']
+    assert len(filled) == 59
+    assert filled['BBB'].notna().all()
+    assert align(frame, fill=False)['BBB'].isna().sum() == 1
+
+
+def test_gaps_do_not_add_zero_returns():
+    frame = closes()
+    frame.iloc[20:25, 1] = np.nan
+    result = compare(frame)
+    # Identical moves apart from the gap: the bar after it carries the whole move
+    assert result['correlation'].loc['AAA', 'BBB'] == pytest.approx(1.0, abs=0.05)
+    assert result['matrix']['BBB'].notna().all()
+
+
+def test_bar_returns_skip_non_positive_prices():
+    values = np.array([[1.0], [0.0], [2.0], [4.0]])
+    with np.errstate(all='raise'):
+        returns = bar_returns(values)
+    assert np.isnan(returns[:2, 0]).all()
+    assert returns[2, 0] == pytest.approx(np.log(2))
+
+
+def test_last_valid_takes_each_columns_last_price():
+    values = np.array([[1.0, np.nan, np.nan], [2.0, 5.0, np.nan], [np.nan, 6.0, np.nan]])
+    last = last_valid(values)
+    assert last[:2].tolist() == [2.0, 6.0]
+    assert np.isnan(last[2])
+    assert last_valid(np.empty((0, 2))).shape == (2,)
+
+
+def test_rankings_handle_a_symbol_without_data():
+    values = closes().to_numpy()
+    values = np.column_stack([values, np.full(len(values), np.nan)])
+    with np.errstate(all='ignore'):
+        table = rankings(values, bar_returns(values), ['AAA', 'BBB', 'CCC'], '1d')
+    assert table.loc['AAA', 'Relative Strength'] == pytest.approx(1.0)
+    assert np.isnan(table.loc['CCC', 'Return'])
@@ -0,0 +1,27 @@
+import context
+from context import PageContext
+
+
+def test_chart_and_company_tabs_share_one_quote(monkeypatch):
+    calls = []
+
+    def quote(symbol):
+        calls.append(('quote', symbol))
+        return {'shortName': 'Apple', 'longName': 'Apple Inc.', 'sector': 'Technology'}
+
+    monkeypatch.setattr(context, 'get_stock_quote', quote)
+    monkeypatch.setattr(context, 'get_company_info', lambda symbol: calls.append(('info', symbol)))
+
+    page = PageContext()
+    future = page.symbol('AAPL').fetch_info()
+    assert page.symbol('AAPL').company_info['Name'] == 'Apple Inc.'
+    assert future.result()['shortName'] == 'Apple'
+    assert page.symbol('AAPL').fetch_info() is future
+    assert calls == [('quote', 'AAPL')]
+
+
+def test_fetch_info_reuses_a_seeded_quote(monkeypatch):
+    monkeypatch.setattr(context, 'get_stock_quote', lambda symbol: 1 / 0)
+    page = PageContext()
+    page.symbol('MSFT').seed_info({'shortName': 'Microsoft'})
+    assert page.symbol('MSFT').fetch_info().result() == {'shortName': 'Microsoft'}
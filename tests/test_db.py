@@ -0,0 +1,33 @@
+import sqlite3
+import threading
+
+import pytest
+
+from db import ConnectionPool
+
+
+def test_exhausted_pool_raises_operational_error(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'test.db'), schema=[], size=1, busy_timeout=0.05)
+    with pool.connection():
+        with pytest.raises(sqlite3.OperationalError):
+            with pool.connection():
+                pass
+    # The connection went back to the pool
+    with pool.connection() as conn:
+        assert conn.execute('SELECT 1').fetchone() == (1,)
+
+
+def test_connections_are_shared_between_threads(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'test.db'), schema=['CREATE TABLE IF NOT EXISTS t (x INTEGER)'], size=2)
+
+    def write(start):
+        for i in range(start, start + 50):
+            with pool.transaction() as conn:
+                conn.execute('INSERT INTO t VALUES (?)', (i,))
+    threads = [threading.Thread(target=write, args=(i * 50,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert pool.fetch_one('SELECT COUNT(*) FROM t') == (200,)
+    assert pool._created <= 2
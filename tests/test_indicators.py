@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import (
+    INDICATOR_COLUMNS, IndicatorEngine, _RollingWindow, calculate_technical_indicators, indicators_panel_frame
+)
+
+
+def bars(count, end='2025-03-03', seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=end, periods=count)
+    return pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))}, index=index)
+
+
+def test_update_matches_batch():
+    df = bars(300)
+    expected = calculate_technical_indicators(df)
+    pd.testing.assert_frame_equal(IndicatorEngine().update(df), expected, check_exact=False, rtol=1e-9)
+
+
+def test_sliding_window_continues_the_state():
+    full = bars(400)
+    engine = IndicatorEngine()
+    engine.update(full.iloc[:300])
+    state = engine._state
+
+    # The same period a day later: one bar fell off the front, one was added
+    result = engine.update(full.iloc[1:301])
+    assert engine._state is state and engine._count == 299
+    expected = calculate_technical_indicators(full.iloc[:301]).iloc[1:]
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+
+    result = engine.update(full.iloc[50:360])
+    expected = calculate_technical_indicators(full.iloc[:360]).iloc[50:]
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+
+
+def test_revised_or_longer_history_starts_over():
+    full = bars(300)
+    engine = IndicatorEngine()
+    engine.update(full.iloc[100:])
+    longer = engine.update(full)
+    pd.testing.assert_frame_equal(longer, calculate_technical_indicators(full), check_exact=False, rtol=1e-9)
+
+    revised = full.copy()
+    revised.iloc[-2, 0] *= 1.1
+    pd.testing.assert_frame_equal(engine.update(revised), calculate_technical_indicators(revised),
+                                  check_exact=False, rtol=1e-9)
+
+
+def test_rolling_sums_do_not_drift():
+    window = _RollingWindow(20)
+    values = np.concatenate([np.full(5000, 1e8), np.random.default_rng(1).normal(1, 0.01, 5020)])
+    for x in values:
+        window.push(x)
+    assert window.mean() == pytest.approx(values[-20:].mean(), rel=1e-12)
+    assert window.std() == pytest.approx(values[-20:].std(ddof=1), rel=1e-6)
+
+
+def test_indicator_columns_are_added():
+    assert list(IndicatorEngine().update(bars(30)).columns) == ['Close'] + INDICATOR_COLUMNS
+
+
+def test_panel_matches_per_symbol_indicators():
+    rng = np.random.default_rng(1)
+    index = pd.bdate_range(end='2025-03-03', periods=400)
+    closes = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (400, 3)), axis=0)),
+                          index=index, columns=['AAA', 'BBB', 'CCC'])
+    closes.iloc[:120, 1] = np.nan            # listed later
+    closes.iloc[[200, 201, 250], 2] = np.nan  # interior gaps
+    panel = indicators_panel_frame(closes)
+    for symbol in closes:
+        expected = calculate_technical_indicators(closes[[symbol]].rename(columns={symbol: 'Close'}))
+        result = panel.xs(symbol, axis=1, level=1)
+        pd.testing.assert_frame_equal(result, expected[INDICATOR_COLUMNS], check_exact=False, rtol=1e-9)
@@ -0,0 +1,31 @@
+import time
+
+from news import NewsIndex, match_expression
+
+
+def article(i, published=None):
+    return {'title': f'Earnings headline {i}', 'publisher': 'Wire', 'link': f'https://example.com/{i}',
+            'summary': 'Quarterly results.', 'providerPublishTime': published}
+
+
+def test_articles_without_a_publish_time_survive_pruning(tmp_path):
+    index = NewsIndex(str(tmp_path / 'news.db'))
+    old = int(time.time() - 400 * 86400)
+    assert index.ingest('AAPL', [article(1), article(2, published=old)]) == 2
+    index.prune(retention_days=30)
+    assert [row['title'] for row in index.page('AAPL')] == ['Earnings headline 1']
+
+
+def test_search_and_count(tmp_path):
+    index = NewsIndex(str(tmp_path / 'news.db'))
+    now = int(time.time())
+    index.ingest('AAPL', [article(i, published=now - i) for i in range(5)])
+    assert index.count('AAPL') == 5
+    assert index.count('AAPL', 'earn') == 5
+    assert index.count('AAPL', 'dividend') == 0
+    assert [row['title'] for row in index.page('AAPL', page=1, page_size=2)] == [
+        'Earnings headline 2', 'Earnings headline 3']
+
+
+def test_match_expression_quotes_every_word():
+    assert match_expression('earnings "guidance" OR (') == '"earnings"* "guidance"* "OR"*'
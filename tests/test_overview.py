@@ -0,0 +1,52 @@
+import json
+import threading
+import time
+
+from overview import OverviewSnapshots
+
+
+def write_snapshot(path, built_at):
+    with open(path, 'w') as f:
+        json.dump({'version': 1, 'built_at': built_at, 'figures': {},
+                   'infos': {'AAPL': {'shortName': 'Apple', 'currentPrice': 100.0}}}, f)
+
+
+def test_recent_snapshot_is_loaded_from_disk(tmp_path):
+    path = tmp_path / 'snapshot.json'
+    write_snapshot(path, time.time() - 60)
+    snapshots = OverviewSnapshots(str(path), refresh_interval=3600, max_age=600)
+    snapshot = snapshots.current()
+    assert snapshot.infos['AAPL']['shortName'] == 'Apple'
+    assert list(snapshot.trending['Symbol']) == ['AAPL']
+
+
+def test_old_snapshot_on_disk_is_ignored(tmp_path):
+    path = tmp_path / 'snapshot.json'
+    write_snapshot(path, time.time() - 3600)
+    assert OverviewSnapshots(str(path), max_age=600).current() is None
+
+
+def test_one_background_refresh_at_a_time(tmp_path, monkeypatch):
+    snapshots = OverviewSnapshots(str(tmp_path / 'snapshot.json'))
+    release = threading.Event()
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        release.wait(5)
+    monkeypatch.setattr(snapshots, 'refresh', refresh)
+
+    for _ in range(5):
+        snapshots.refresh_after([])
+    release.set()
+    deadline = time.time() + 5
+    while snapshots._pending and time.time() < deadline:
+        time.sleep(0.01)
+    assert calls == [1]
+
+    # Once it is done, the next rerun may start another
+    snapshots.refresh_after([])
+    deadline = time.time() + 5
+    while len(calls) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert calls == [1, 1]
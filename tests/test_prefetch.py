@@ -0,0 +1,37 @@
+import threading
+import time
+
+import config
+import prefetch
+
+
+def test_jobs_pause_while_no_session_is_active(monkeypatch):
+    runs = []
+    monkeypatch.setattr(prefetch, 'JOBS', [('job', lambda: runs.append(time.monotonic()) or True)])
+    monkeypatch.setattr(config, 'PREFETCH_INTERVAL', 0.01)
+    monkeypatch.setattr(config, 'PREFETCH_IDLE_AFTER', 0.2)
+    monkeypatch.setattr(prefetch, '_last_activity', 0.0)
+    prefetch._stop.clear()
+    thread = threading.Thread(target=prefetch._run, daemon=True)
+    thread.start()
+    try:
+        time.sleep(0.1)
+        assert runs == []
+
+        prefetch.record_activity()
+        time.sleep(0.1)
+        assert runs
+
+        # Idle again: no more runs until the next session renders
+        time.sleep(0.3)
+        count = len(runs)
+        time.sleep(0.2)
+        assert len(runs) == count
+        prefetch.record_activity()
+        time.sleep(0.1)
+        assert len(runs) > count
+    finally:
+        prefetch._stop.set()
+        prefetch._wake.set()
+        thread.join(1)
+    assert not thread.is_alive()
@@ -0,0 +1,81 @@
+import pandas as pd
+
+from price_store import PriceStore
+
+
+class Upstream:
+    """Fake history endpoint over a fixed set of bars, recording every request."""
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.requests = []
+
+    def __call__(self, symbol, interval, period=None, start=None):
+        self.requests.append('full' if start is None else 'tail')
+        return self.bars if start is None else self.bars[self.bars.index >= start]
+
+
+def bars(index, scale=1.0):
+    # Each bar's price depends only on its time, so a longer series extends a shorter one
+    close = (100 + (index - pd.Timestamp('2024-01-01', tz=index.tz)).total_seconds() / 86400) * scale
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': 1e6}, index=index)
+
+
+def daily(count):
+    return pd.date_range(start='2024-06-03', periods=count, freq='B', tz='America/New_York')
+
+
+def store(tmp_path, upstream, **kwargs):
+    return PriceStore(str(tmp_path), fetch=upstream, min_refresh=0, **kwargs)
+
+
+def test_later_loads_only_fetch_new_bars(tmp_path):
+    upstream = Upstream(bars(daily(100)))
+    prices = store(tmp_path, upstream)
+    prices.load('AAPL', '1y')
+    upstream.bars = bars(daily(105))
+    df = prices.load('AAPL', '1y')
+    assert upstream.requests == ['full', 'tail']
+    pd.testing.assert_frame_equal(df, upstream.bars, check_names=False, check_freq=False)
+
+
+def test_repeated_timestamps_from_upstream(tmp_path):
+    upstream = Upstream(bars(daily(100)))
+    prices = store(tmp_path, upstream)
+    prices.load('AAPL', '1y')
+    fresh = bars(daily(102))
+    upstream.bars = pd.concat([fresh, fresh]).sort_index()
+    df = prices.load('AAPL', '1y')
+    assert df.index.is_unique
+    pd.testing.assert_frame_equal(df, fresh, check_names=False, check_freq=False)
+
+
+def test_readjusted_history_is_fetched_again(tmp_path):
+    upstream = Upstream(bars(daily(100)))
+    prices = store(tmp_path, upstream)
+    prices.load('AAPL', '1y')
+    upstream.bars = bars(daily(101), scale=0.5)
+    df = prices.load('AAPL', '1y')
+    assert upstream.requests == ['full', 'tail', 'full']
+    pd.testing.assert_frame_equal(df, upstream.bars, check_names=False, check_freq=False)
+
+
+def test_parts_are_compacted(tmp_path):
+    upstream = Upstream(bars(daily(50)))
+    prices = store(tmp_path, upstream, max_parts=2)
+    for count in range(51, 56):
+        upstream.bars = bars(daily(count))
+        df = prices.load('AAPL', '1y')
+    manifest = prices._read_manifest(prices._dir('AAPL', '1d'))
+    assert len(manifest['parts']) <= 2
+    assert len(list((tmp_path / '1d' / 'AAPL').glob('*.parquet'))) == len(manifest['parts'])
+    pd.testing.assert_frame_equal(df, upstream.bars, check_names=False, check_freq=False)
+
+
+def test_old_intraday_bars_are_dropped(tmp_path):
+    minutes = pd.date_range(end='2025-03-03 16:00', periods=5 * 24 * 60, freq='min', tz='America/New_York')
+    upstream = Upstream(bars(minutes))
+    df = store(tmp_path, upstream, intraday_days=2).load('AAPL', '5d', '1m')
+    assert df.index[0] >= minutes[-1] - pd.Timedelta(days=2)
+    assert df.index[-1] == minutes[-1]
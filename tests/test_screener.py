@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import screener
+from screener import ScreenerIndex, _tokenize, parse_query, screen
+
+
+class FakeStore:
+    def __init__(self, histories):
+        self.histories = histories
+        self.loads = 0
+
+    def load(self, symbol, period='1y', interval='1d'):
+        self.loads += 1
+        return self.histories[symbol].copy()
+
+
+def history(closes, end='2025-03-03'):
+    index = pd.bdate_range(end=end, periods=len(closes))
+    closes = np.asarray(closes, dtype=float)
+    return pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes, 'Close': closes,
+                         'Volume': np.full(len(closes), 1000)}, index=index)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    universe = tmp_path / 'universe.csv'
+    universe.write_text('Symbol,Name,Sector\nAAA,Alpha,Tech\nBBB,Beta,Energy\n')
+    monkeypatch.setattr(screener, 'cached', lambda kind, symbol, load: {'trailingPE': 10.0, 'marketCap': 1e9})
+    store = FakeStore({'AAA': history(np.linspace(50, 100, 250)), 'BBB': history(np.linspace(80, 40, 250))})
+    return ScreenerIndex(str(tmp_path / 'index.parquet'), str(universe), store=store)
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'Name': ['Alpha', 'Beta', 'Gamma'],
+        'Sector': ['Tech', 'Energy', 'Tech'],
+        'Price': [100.0, 40.0, 250.0],
+        'RSI': [25.0, 55.0, 75.0],
+        'MA200': [90.0, 60.0, 200.0],
+        'MarketCap': [2e9, 5e11, 1.5e12],
+        'Golden_Cross': [True, False, True],
+    }, index=pd.Index(['AAA', 'BBB', 'CCC'], name='Symbol'))
+
+
+def test_tokenize_numbers_fields_and_keywords():
+    tokens = _tokenize('RSI < 30 and mcap >= 1.5b or not golden_cross')
+    assert tokens == [('word', 'RSI'), ('op', '<'), ('number', 30.0), ('and', 'and'),
+                      ('word', 'MarketCap'), ('op', '>='), ('number', 1.5e9), ('or', 'or'),
+                      ('not', 'not'), ('word', 'Golden_Cross')]
+
+
+def test_tokenize_strings_and_percent():
+    assert _tokenize('sector = "Tech" and change > -2%') == [
+        ('word', 'Sector'), ('op', '='), ('string', 'Tech'), ('and', 'and'),
+        ('word', 'Change'), ('op', '>'), ('number', -2.0)]
+
+
+@pytest.mark.parametrize('text', ['volume > 3', 'rsi < 30 $', 'rsi <', '(rsi < 30', 'rsi 30',
+                                  'name > 3', 'sector < "Tech"', '1 < 2', 'price'])
+def test_parse_errors_are_value_errors(text):
+    with pytest.raises(ValueError):
+        parse_query(text)(pd.DataFrame(columns=['Price', 'Name', 'Sector']))
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('', ['AAA', 'BBB', 'CCC']),
+    ('rsi < 30', ['AAA']),
+    ('price > ma200', ['AAA', 'CCC']),
+    ('golden_cross and market_cap > 1t', ['CCC']),
+    ('not golden_cross', ['BBB']),
+    ('sector = "tech" and (rsi < 30 or rsi > 70)', ['AAA', 'CCC']),
+    ('sector != \'Tech\'', ['BBB']),
+    ('rsi > 30 and rsi < 70 or symbol = "aaa"', ['AAA', 'BBB']),
+])
+def test_screen_filters(frame, text, expected):
+    assert list(screen(frame, text, sort_by=None)['Symbol']) == expected
+
+
+def test_screen_sorts_and_limits(frame):
+    result = screen(frame, 'price > 0', sort_by='Price', ascending=True, limit=2)
+    assert list(result['Symbol']) == ['BBB', 'AAA']
+
+
+def test_rebuild_builds_every_symbol(index):
+    assert index.refresh(max_age=0)
+    frame = index.frame()
+    assert list(frame.index) == ['AAA', 'BBB']
+    assert frame.at['AAA', 'Price'] == 100
+    assert frame.at['AAA', 'MarketCap'] == 1e9
+    assert frame.at['AAA', 'MA200'] == pytest.approx(np.linspace(50, 100, 250)[-200:].mean())
+
+
+def test_rebuild_picks_up_a_moving_close_on_the_same_bar(index):
+    index.refresh(max_age=0)
+    today = index.store.histories['AAA']
+    today.iloc[-1, today.columns.get_loc('Close')] = 130.0
+    index.refresh(max_age=0)
+    frame = index.frame()
+    assert frame.at['AAA', 'Price'] == 130
+    assert frame.at['AAA', 'Change'] == pytest.approx((130 / today['Close'].iloc[-2] - 1) * 100)
+    assert frame.at['BBB', 'Price'] == 40
+
+
+def test_rebuild_keeps_unchanged_rows(index, monkeypatch):
+    index.refresh(max_age=0)
+    computed = []
+    real = screener.indicator_rows
+    monkeypatch.setattr(screener, 'indicator_rows', lambda histories: computed.append(list(histories)) or real(histories))
+    index.store.histories['BBB'] = history(np.linspace(80, 41, 251), end='2025-03-04')
+    index.refresh(max_age=0)
+    assert computed == [['BBB']]
+    assert index.frame().at['BBB', 'Price'] == 41
+
+
+def test_index_is_reloaded_from_disk(index):
+    index.refresh(max_age=0)
+    reloaded = ScreenerIndex(index.path, index.universe_path, store=index.store)
+    pd.testing.assert_frame_equal(reloaded.frame(), index.frame())
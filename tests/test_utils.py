@@ -0,0 +1,39 @@
+import utils
+from cache import market_cache
+from db import ConnectionPool
+from metrics import registry
+
+
+def failing_load(symbol, period, interval):
+    raise ConnectionError('upstream down')
+
+
+def errors(function):
+    return {row['function']: row['errors'] for row in registry.summary()['functions']}.get(function)
+
+
+def test_failed_history_loads_count_as_errors(monkeypatch):
+    market_cache.clear()
+    registry.reset()
+    monkeypatch.setattr(utils.price_store, 'load', failing_load)
+    assert utils.get_stock_history('FAIL') is None
+    assert errors('get_stock_history') == 1
+
+
+def test_failed_quotes_count_as_errors(monkeypatch):
+    market_cache.clear()
+    registry.reset()
+    monkeypatch.setattr(utils, 'fetch_quote_info', lambda symbol: 1 / 0)
+    assert utils.get_stock_quote('FAIL') is None
+    assert errors('get_stock_quote') == 1
+
+
+def test_watchlist_edit_counts_rows_it_deleted(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, 'pool', ConnectionPool(str(tmp_path / 'users.db')))
+    utils.init_watchlist_db()
+    utils.update_watchlist('a@example.com', add=['AAPL', 'MSFT'])
+    # NVDA was never on the list (e.g. another session removed it first)
+    symbols, added, removed = utils.update_watchlist('a@example.com', add=['TSLA'], remove=['MSFT', 'NVDA'])
+    assert symbols == ['AAPL', 'TSLA']
+    assert added == ['TSLA']
+    assert removed == 1
@@ -1,168 +1,224 @@
-import yfinance as yf
 import pandas as pd
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import sqlite3
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextvars import copy_context
+import time
+import config
+from metrics import timed, timer
+from cache import cached
+from price_store import price_store
+from history import compact_history
+from charts import price_figure
+from db import pool
+from providers import get_provider
+from news import news_index
+
+# Shared, bounded pool for fanning out per-symbol upstream calls
+_fetch_pool = ThreadPoolExecutor(max_workers=config.FETCH_MAX_WORKERS,
+                                 thread_name_prefix='fetch')
+
+# The wrappers below turn failures into None, so each times its work with
+# `timer` inside the try and the failure still counts as an error
+def get_stock_history(symbol, period='1y', interval='1d'):
+    try:
+        with timer('get_stock_history', symbol):
+            return cached('history', symbol,
+                          lambda: compact_history(price_store.load(symbol, period, interval)),
+                          period=period, interval=interval)
+    except Exception as e:
+        print(f"Error loading history for {symbol}: {str(e)}")
+        return None
 
-def get_stock_data(symbol, period='1y', interval='1d'):
+def get_stock_quote(symbol):
     try:
-        stock = yf.Ticker(symbol)
-        df = stock.history(period=period, interval=interval)
-        return df, stock.info
+        with timer('get_stock_quote', symbol):
+            return fetch_quote_info(symbol)
     except Exception as e:
-        return None, None
+        print(f"Error loading quote for {symbol}: {str(e)}")
+        return None
 
 def create_candlestick_chart(df, symbol, chart_type='candlestick'):
-    if chart_type == 'candlestick':
-        fig = go.Figure(data=[go.Candlestick(x=df.index,
-                    open=df['Open'],
-                    high=df['High'],
-                    low=df['Low'],
-                    close=df['Close'])])
-    elif chart_type == 'line':
-        fig = go.Figure(data=[go.Scatter(x=df.index, y=df['Close'], mode='lines')])
-    elif chart_type == 'area':
-        fig = go.Figure(data=[go.Scatter(x=df.index, y=df['Close'], fill='tozeroy')])
-
-    fig.update_layout(
-        title=f'{symbol} Stock Price',
-        yaxis_title='Price',
-        template='plotly_dark',
-        plot_bgcolor='rgba(19,47,76,0.8)',
-        paper_bgcolor='rgba(19,47,76,0.8)',
-        xaxis_rangeslider_visible=False,
-        hoverlabel=dict(
-            bgcolor="white",
-            font_size=12,
-            font_family="sans-serif"
-        )
-    )
-    return fig
+    return price_figure(df, symbol, chart_type)
+
+def company_info_from(info):
+    return {
+        'Name': info.get('longName', ''),
+        'Sector': info.get('sector', ''),
+        'Industry': info.get('industry', ''),
+        'Website': info.get('website', ''),
+        'Description': info.get('longBusinessSummary', ''),
+        'PE Ratio': info.get('trailingPE', 'N/A'),
+        'Market Cap': info.get('marketCap', 0),
+        '52 Week High': info.get('fiftyTwoWeekHigh', 0),
+        '52 Week Low': info.get('fiftyTwoWeekLow', 0),
+        'Volume': info.get('volume', 0),
+        'Avg Volume': info.get('averageVolume', 0)
+    }
 
 def get_company_info(symbol):
     try:
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        return {
-            'Name': info.get('longName', ''),
-            'Sector': info.get('sector', ''),
-            'Industry': info.get('industry', ''),
-            'Website': info.get('website', ''),
-            'Description': info.get('longBusinessSummary', ''),
-            'PE Ratio': info.get('trailingPE', 'N/A'),
-            'Market Cap': info.get('marketCap', 0),
-            '52 Week High': info.get('fiftyTwoWeekHigh', 0),
-            '52 Week Low': info.get('fiftyTwoWeekLow', 0),
-            'Volume': info.get('volume', 0),
-            'Avg Volume': info.get('averageVolume', 0)
-        }
-    except:
+        with timer('get_company_info', symbol):
+            return company_info_from(cached('info', symbol, lambda: get_provider().info(symbol)))
+    except Exception as e:
+        print(f"Error loading company info for {symbol}: {str(e)}")
         return None
 
-def get_trending_stocks():
-    trending = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA', 'JPM', 'V', 'WMT', 
-                'DIS', 'NFLX', 'PYPL', 'INTC', 'AMD', 'BAC', 'KO', 'PEP', 'NKE']
+def submit_fetch(fetch, *args):
+    """Start fetch(*args) on the shared pool, in a copy of the caller's context; returns a Future."""
+    return _fetch_pool.submit(copy_context().run, fetch, *args)
+
+def fetch_many(symbols, fetch, timeout=config.FETCH_TIMEOUT):
+    """Run fetch(symbol) for every symbol concurrently on the shared pool.
+
+    Returns {symbol: result} in input order. Symbols that raise, or that are
+    still running `timeout` seconds after their fetch started, are left out.
+    """
+    started = {}
+
+    def run(symbol):
+        started[symbol] = time.monotonic()
+        return fetch(symbol)
+
+    # Each task runs in a copy of the caller's context (e.g. a cache refresh in progress)
+    futures = {_fetch_pool.submit(copy_context().run, run, symbol): symbol for symbol in symbols}
+    pending = set(futures)
+    results = {}
+    while pending:
+        now = time.monotonic()
+        deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+        wait_for = max(0, min(deadlines) - now) if deadlines else timeout
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            symbol = futures[future]
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                print(f"Error fetching data for {symbol}: {str(e)}")
+
+        # Give up on calls that have overrun their own timeout
+        now = time.monotonic()
+        for future in list(pending):
+            symbol = futures[future]
+            if symbol in started and now - started[symbol] >= timeout:
+                print(f"Timed out fetching data for {symbol}")
+                pending.discard(future)
+    return {symbol: results[symbol] for symbol in symbols if symbol in results}
+
+def fetch_quote_info(symbol):
+    """Cached info snapshot; unlike get_stock_quote, upstream errors propagate."""
+    return cached('quote', symbol, lambda: get_provider().info(symbol))
+
+def get_trending_infos(fetch=fetch_quote_info):
+    return fetch_many(config.TRENDING_SYMBOLS, fetch)
+
+def trending_frame(infos):
     data = []
-    for symbol in trending:
-        try:
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            data.append({
-                'Symbol': symbol,
-                'Name': info.get('shortName', ''),
-                'Price': info.get('currentPrice', 0),
-                'Change': info.get('regularMarketChangePercent', 0),
-                'Volume': info.get('volume', 0),
-                'Market Cap': info.get('marketCap', 0),
-                'Industry': info.get('industry', 'N/A'),
-                'Sector': info.get('sector', 'N/A'),
-                'EPS': info.get('trailingEPS', 0),
-                'PE': info.get('trailingPE', 0),
-                'Dividend Yield': info.get('dividendYield', 0) * 100 if info.get('dividendYield') else 0,
-                'Target Price': info.get('targetMeanPrice', 0)
-            })
-        except Exception as e:
-            print(f"Error fetching data for {symbol}: {str(e)}")
-            continue
+    for symbol, info in infos.items():
+        data.append({
+            'Symbol': symbol,
+            'Name': info.get('shortName', ''),
+            'Price': info.get('currentPrice', 0),
+            'Change': info.get('regularMarketChangePercent', 0),
+            'Volume': info.get('volume', 0),
+            'Market Cap': info.get('marketCap', 0),
+            'Industry': info.get('industry', 'N/A'),
+            'Sector': info.get('sector', 'N/A'),
+            'EPS': info.get('trailingEPS', 0),
+            'PE': info.get('trailingPE', 0),
+            'Dividend Yield': info.get('dividendYield', 0) * 100 if info.get('dividendYield') else 0,
+            'Target Price': info.get('targetMeanPrice', 0)
+        })
     return pd.DataFrame(data)
 
-def get_stock_news(symbol):
+@timed('get_trending_stocks')
+def get_trending_stocks(fetch=fetch_quote_info):
+    return trending_frame(get_trending_infos(fetch))
+
+def get_batch_quotes(symbols):
+    """Last price and percent change for every symbol from a single batched download."""
+    if not symbols:
+        return {}
+    key = tuple(sorted(set(symbols)))
     try:
-        stock = yf.Ticker(symbol)
-        news = stock.news
-        return [{
-            'title': article.get('title', ''),
-            'publisher': article.get('publisher', ''),
-            'link': article.get('link', ''),
-            'published': datetime.fromtimestamp(article.get('providerPublishTime', 0)).strftime('%Y-%m-%d %H:%M'),
-            'summary': article.get('summary', '')
-        } for article in news[:5]]
-    except:
-        return []
+        with timer('get_batch_quotes'):
+            return cached('quote', key, lambda: get_provider().quotes(list(key)))
+    except Exception as e:
+        print(f"Error fetching quotes for {', '.join(key)}: {str(e)}")
+        return {}
 
-def calculate_technical_indicators(df):
-    if df is None or len(df) == 0:
+def get_price_matrix(symbols, period='1y', interval='1d'):
+    """Closes for many symbols from one batched request, as a time x symbol frame."""
+    if not symbols:
         return None
+    key = tuple(sorted(set(symbols)))
+    try:
+        with timer('get_price_matrix'):
+            matrix = cached('history', key,
+                            lambda: get_provider().closes(list(key), period, interval),
+                            period=period, interval=interval)
+    except Exception as e:
+        print(f"Error fetching prices for {len(key)} symbols: {str(e)}")
+        return None
+    return matrix[[symbol for symbol in symbols if symbol in matrix.columns]]
 
-    # Basic indicators
-    df['MA20'] = df['Close'].rolling(window=20).mean()
-    df['MA50'] = df['Close'].rolling(window=50).mean()
-    df['MA200'] = df['Close'].rolling(window=200).mean()
-
-    # RSI
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['RSI'] = 100 - (100 / (1 + rs))
-
-    # MACD
-    exp1 = df['Close'].ewm(span=12, adjust=False).mean()
-    exp2 = df['Close'].ewm(span=26, adjust=False).mean()
-    df['MACD'] = exp1 - exp2
-    df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
+def sync_news(symbol):
+    """Refill the local news index for `symbol` from upstream if it is stale."""
+    news_index.sync(symbol, lambda: cached('news', symbol, lambda: get_provider().news(symbol)))
 
-    # Bollinger Bands
-    df['BB_middle'] = df['Close'].rolling(window=20).mean()
-    df['BB_upper'] = df['BB_middle'] + 2 * df['Close'].rolling(window=20).std()
-    df['BB_lower'] = df['BB_middle'] - 2 * df['Close'].rolling(window=20).std()
+def get_stock_news(symbol, limit=5):
+    try:
+        with timer('get_stock_news', symbol):
+            sync_news(symbol)
+            return news_index.page(symbol, page_size=limit)
+    except Exception as e:
+        print(f"Error loading news for {symbol}: {str(e)}")
+        return []
 
-    return df
+SELECT_WATCHLIST = 'SELECT symbol, position FROM watchlist WHERE email = ? ORDER BY position, rowid'
+DELETE_WATCHLIST = 'DELETE FROM watchlist WHERE email = ? AND symbol = ?'
+UPSERT_WATCHLIST = '''INSERT INTO watchlist (email, symbol, position) VALUES (?, ?, ?)
+                      ON CONFLICT(email, symbol) DO UPDATE SET position = excluded.position'''
 
 def init_watchlist_db():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS watchlist
-                 (email TEXT, symbol TEXT,
-                  PRIMARY KEY (email, symbol))''')
-    conn.commit()
-    conn.close()
+    pool.ensure_schema()
+
+def edited_watchlist(symbols, add=(), remove=(), order=None):
+    """`symbols` with `remove` dropped and new `add` symbols appended.
+
+    `order` lists symbols to move to the front, in that order; the rest keep
+    their relative order after them.
+    """
+    removed = set(remove)
+    result = [s for s in symbols if s not in removed]
+    result += [s for s in dict.fromkeys(add) if s not in removed and s not in result]
+    if order:
+        first = [s for s in dict.fromkeys(order) if s in result]
+        result = first + [s for s in result if s not in first]
+    return result
+
+def update_watchlist(email, add=(), remove=(), order=None):
+    """Apply a batch of watchlist edits in one transaction.
+
+    Only rows that are new or change position are written. Returns the
+    resulting watchlist, the symbols that were newly added and the number
+    of rows deleted.
+    """
+    with pool.transaction() as conn:
+        # Take the write lock before reading so concurrent edits can't interleave
+        conn.execute('BEGIN IMMEDIATE')
+        rows = conn.execute(SELECT_WATCHLIST, (email,)).fetchall()
+        positions = dict(rows)
+        symbols = edited_watchlist([r[0] for r in rows], add, remove, order)
+        kept = set(symbols)
+        deleted = conn.executemany(DELETE_WATCHLIST, [(email, s) for s in positions if s not in kept]).rowcount
+        conn.executemany(UPSERT_WATCHLIST, [(email, s, i) for i, s in enumerate(symbols) if positions.get(s) != i])
+    return symbols, [s for s in symbols if s not in positions], deleted
 
 def add_to_watchlist(email, symbol):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    try:
-        c.execute('INSERT INTO watchlist (email, symbol) VALUES (?, ?)',
-                 (email, symbol))
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError:
-        conn.close()
-        return False
+    _, added, _ = update_watchlist(email, add=[symbol])
+    return bool(added)
 
 def remove_from_watchlist(email, symbol):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM watchlist WHERE email = ? AND symbol = ?',
-             (email, symbol))
-    conn.commit()
-    conn.close()
+    update_watchlist(email, remove=[symbol])
 
 def get_watchlist(email):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT symbol FROM watchlist WHERE email = ?', (email,))
-    result = c.fetchall()
-    conn.close()
-    return [r[0] for r in result]
\ No newline at end of file
+    return [r[0] for r in pool.fetch_all(SELECT_WATCHLIST, (email,))]
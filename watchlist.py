@@ -0,0 +1,95 @@
+"""Session-scoped watchlist cache with write-through updates.
+
+A session loads its watchlist from the database once and keeps it in
+st.session_state. Edits, single or in bulk, write through to both the
+database and that copy in one transaction. A process-wide version counter per account tells other sessions
+on the same account that their copy is stale, so a steady-state rerun
+makes no database queries.
+"""
+
+import csv
+import io
+import threading
+
+import streamlit as st
+
+import config
+from utils import get_watchlist, update_watchlist
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def _version(email):
+    return _versions.get(email, 0)
+
+
+def _bump(email):
+    with _versions_lock:
+        _versions[email] = _versions.get(email, 0) + 1
+        return _versions[email]
+
+
+def _apply(email, new_version, change):
+    # Patch the session copy only if it was current right before this write;
+    # otherwise another session changed the list too and we reload next time
+    cached = st.session_state.get('watchlist_cache')
+    if cached and cached['email'] == email and cached['version'] == new_version - 1:
+        cached['symbols'] = change(cached['symbols'])
+        cached['version'] = new_version
+    else:
+        st.session_state.pop('watchlist_cache', None)
+
+
+def load_watchlist(email):
+    cached = st.session_state.get('watchlist_cache')
+    if cached and cached['email'] == email and cached['version'] == _version(email):
+        return cached['symbols']
+    # Read the version first so a write racing with this query forces a reload
+    version = _version(email)
+    symbols = get_watchlist(email)
+    st.session_state.watchlist_cache = {'email': email, 'version': version, 'symbols': symbols}
+    return symbols
+
+
+def edit_watchlist(email, add=(), remove=(), order=None):
+    """Add, remove and reorder symbols in one write.
+
+    Returns the symbols that were added and the number actually removed.
+    """
+    symbols, added, removed = update_watchlist(email, add, remove, order)
+    _apply(email, _bump(email), lambda _: symbols)
+    return added, removed
+
+
+def add_symbol(email, symbol):
+    return bool(edit_watchlist(email, add=[symbol])[0])
+
+
+def remove_symbol(email, symbol):
+    edit_watchlist(email, remove=[symbol])
+
+
+def symbols_from_csv(data, limit=config.WATCHLIST_MAX_SYMBOLS):
+    """Unique upper-cased symbols from CSV bytes or text, in file order.
+
+    Reads the Symbol (or Ticker) column if the file has a header naming one,
+    otherwise the first column.
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    rows = [row for row in csv.reader(io.StringIO(data)) if row and row[0].strip()]
+    column = 0
+    if rows:
+        header = [cell.strip().lower() for cell in rows[0]]
+        for name in ('symbol', 'ticker'):
+            if name in header:
+                column = header.index(name)
+                rows = rows[1:]
+                break
+    symbols = (row[column].strip().upper() for row in rows if len(row) > column)
+    return list(dict.fromkeys(s for s in symbols if s and s.replace('.', '').replace('-', '').replace('^', '').isalnum()))[:limit]
+
+
+def clear_watchlist_cache():
+    st.session_state.pop('watchlist_cache', None)